@@ -74,6 +74,21 @@ class EvertimsSettings(PropertyGroup):
             description="Port used by Blender to read data sent by the Evertims client",
             default=4001,
             )
+    osc_bundle_size: IntProperty(
+            name="Max bundle size",
+            description="Maximum size (in bytes) of OSC bundles used to send queued messages (e.g. room geometry), 0 to send messages one by one. Use e.g. 1400 over a network, up to 65507 on loopback",
+            default=1400, min=0, max=65507
+            )
+    osc_bulk_size: IntProperty(
+            name="Room upload budget",
+            description="Maximum size (in bytes) of room geometry sent per update, the rest being sent on the next updates, for source and listener updates not to wait for large rooms. 0 to send rooms at once",
+            default=65536, min=0
+            )
+    send_thread: BoolProperty(
+            name="Send in background thread",
+            description="Encode and send OSC messages in a background thread rather than in Blender main thread",
+            default=False,
+            )
     is_client_connected: BoolProperty(
             name="Is Evertims client connected",
             description="Set to true if connection to Evertims client can be established",
@@ -130,6 +145,16 @@ class EvertimsSettings(PropertyGroup):
             description="Maximum order of image source reflections drawn on screen",
             default=3,
             )
+    receive_time_budget: FloatProperty(
+            name="Receive time budget (ms)",
+            description="Maximum time spent handling incoming rays per update, 0 to handle a single packet per update",
+            default=20, min=0, max=1000
+            )
+    receive_thread: BoolProperty(
+            name="Receive in background thread",
+            description="Receive and decode rays in a background thread rather than in Blender main thread",
+            default=False,
+            )
 
     enable_auralization: BoolProperty(
             name="Enable auralization",
@@ -165,9 +190,14 @@ class EvertimsSettings(PropertyGroup):
             )
     export_file_path: StringProperty(
             name="Export scene file path",
-            description="Path to which scene will be exported",
+            description="Path to which scene will be exported: .txt for a list of OSC messages, .osclog for a binary log of OSC packets (see evertims/evertReplay.py), .osclog.gz or .osclog.xz for a compressed one",
             default="//evert-export.txt", maxlen=1024, subtype="FILE_PATH",
             )
+    export_animation: BoolProperty(
+            name="Export frame range",
+            description="Export scene animation over scene frame range (requires a .osclog, .osclog.gz, or .osclog.xz export file), rather than a static snapshot",
+            default=False,
+            )
 
     # Source directivity
     source_directivity_type: EnumProperty(
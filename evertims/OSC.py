@@ -159,9 +159,12 @@ Original Comments
 """
 
 import math, re, socket, select, string, struct, sys, threading, time, types, array, errno, inspect
+import heapq, itertools
 import socketserver
 from socketserver import UDPServer, DatagramRequestHandler, ThreadingMixIn, StreamRequestHandler, TCPServer
 from contextlib import closing
+from collections import deque, OrderedDict
+from functools import lru_cache
 import os
 global version
 version = ("0.3","6", "$Rev: 6382 $"[6:-2])
@@ -185,7 +188,11 @@ NTP_units_per_second = 0x100000000 # about 232 picoseconds
 ##
 
 try:
-	from numpy import typeDict
+	try:
+		from numpy import typeDict
+	except ImportError:
+		# numpy >= 1.24
+		from numpy import sctypeDict as typeDict
 
 	for ftype in ['float32', 'float64', 'float128']:
 		try:
@@ -207,6 +214,12 @@ except ImportError:
 	# print ('Cannot import numpy in OSC.py')
 	pass
 
+# numpy module, used (when available) to decode homogeneous arguments into arrays
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
 ######
 #
 # OSCMessage classes
@@ -278,6 +291,13 @@ class OSCMessage(object):
 		elif isinstance(argument, OSCMessage):
 			raise TypeError("Can only append 'OSCMessage' to 'OSCBundle'")
 
+		# fast path: homogeneous sequence of numbers, packed in a single call
+		packed = OSCNumericArray(argument, typehint)
+		if packed != None:
+			self.typetags += packed[0]
+			self.message += packed[1]
+			return
+
 		if hasattr(argument, '__iter__') and not type(argument) in (str,bytes):
 			for arg in argument:
 				self.append(arg, typehint)
@@ -565,6 +585,77 @@ class OSCMessage(object):
 		"""
 		return iter(self.tags())
 
+class OSCMessageTemplate(OSCMessage):
+	"""OSCMessage with a frozen OSC-address and frozen (numeric) typetags, for messages sent
+	repeatedly with new argument values, e.g. an object transform.
+	The address and typetags are encoded once, upon creation, in a reusable bytearray. Setting
+	new values only packs them in place, after the encoded address and typetags, with a
+	precompiled struct (see setValues).
+
+	  - 'address' is the OSC-address of the message
+	  - 'typetags' are the typetags of the message arguments, without ','. only 'i', 'f' and 'd'
+	are supported
+	"""
+	def __init__(self, address, typetags):
+		"""Instantiate a new OSCMessageTemplate. Argument values are all zero until setValues
+		is called.
+		"""
+		for tag in typetags:
+			if tag not in 'ifd':
+				raise OSCError("OSCMessageTemplate only supports 'i', 'f' and 'd' typetags, got '%s'" % typetags)
+
+		self.address = address
+		self.typetags = ',' + typetags
+
+		header = OSCString(self.address) + OSCString(self.typetags)
+		self._headerSize = len(header)
+		self._struct = struct.Struct('>' + typetags)
+		self.buffer = bytearray(self._headerSize + self._struct.size)
+		self.buffer[:self._headerSize] = header
+
+	def setValues(self, values):
+		"""Set the message arguments. 'values' is a sequence of as many numbers as typetags
+		"""
+		self._struct.pack_into(self.buffer, self._headerSize, *values)
+
+	def setAddress(self, address):
+		raise OSCError("Can not change the address of an OSCMessageTemplate")
+
+	def clearData(self):
+		raise OSCError("Can not clear the arguments of an OSCMessageTemplate, use setValues()")
+
+	def append(self, argument, typehint=None):
+		raise OSCError("Can not append to an OSCMessageTemplate, use setValues()")
+
+	@property
+	def message(self):
+		"""The binary representation of the message arguments
+		"""
+		return bytes(self.buffer[self._headerSize:])
+
+	@property
+	def size(self):
+		"""The size of the binary representation of the message, in bytes
+		"""
+		return len(self.buffer)
+
+	def getBinary(self):
+		"""Returns the binary representation of the message
+		"""
+		return bytes(self.buffer)
+
+	def copy(self):
+		"""Returns a copy of this OSCMessageTemplate, with its own buffer (i.e. that
+		is not changed by later calls to setValues() on this one)
+		"""
+		msg = OSCMessageTemplate.__new__(OSCMessageTemplate)
+		msg.address = self.address
+		msg.typetags = self.typetags
+		msg._headerSize = self._headerSize
+		msg._struct = self._struct
+		msg.buffer = bytearray(self.buffer)
+		return msg
+
 class OSCBundle(OSCMessage):
 	"""Builds a 'bundle' of OSC messages.
 
@@ -630,7 +721,7 @@ class OSCBundle(OSCMessage):
 		  - if 'args' appears in the dict, its value(s) become the OSCMessage's arguments
 		"""
 		if isinstance(argument, OSCMessage):
-			binary = OSCBlob(argument.getBinary())
+			binary = argument.getBinary()
 		else:
 			msg = OSCMessage(self.address)
 			if isinstance(argument,dict):
@@ -641,9 +732,11 @@ class OSCBundle(OSCMessage):
 			else:
 				msg.append(argument, typehint)
 
-			binary = OSCBlob(msg.getBinary())
+			binary = msg.getBinary()
 
-		self.message += binary
+		# message binaries are always a multiple of 4 bytes long: size-prefix them directly
+		# rather than through OSCBlob
+		self.message += struct.pack('>i', len(binary)) + binary
 		self.typetags += 'b'
 
 	def getBinary(self):
@@ -694,6 +787,62 @@ class OSCBundle(OSCMessage):
 		copy.timetag = self.timetag
 		return copy
 
+class OSCBundleWriter:
+	"""Builds the binary representation of an OSC-bundle in a single growing bytearray.
+	Messages are serialized straight into it, each preceded by its size (written in place),
+	without intermediate OSCBlob / bytes copies. The running size of the bundle ('size') lets
+	callers split bundles at a byte limit.
+	Like OSCMessage and OSCBundle, an OSCBundleWriter can be passed to OSCClient send methods.
+
+	  - 'time' is the timetag of the bundle, in 'Python Time' (0 means 'immediately')
+	"""
+	def __init__(self, time=0):
+		"""Instantiate a new, empty, OSCBundleWriter
+		"""
+		self.timetag = time
+		self.buffer = bytearray(OSCString("#bundle") + OSCTimeTag(time))
+		self._headerSize = len(self.buffer)
+		self.count = 0
+
+	def append(self, msg):
+		"""Append OSCMessage (or OSCBundle, or binary representation of either) to the bundle
+		"""
+		if isinstance(msg, OSCMessageTemplate):
+			binary = msg.buffer
+		elif isinstance(msg, OSCMessage):
+			binary = msg.getBinary()
+		else:
+			binary = msg
+
+		offset = len(self.buffer)
+		self.buffer += b'\0\0\0\0'
+		struct.pack_into('>i', self.buffer, offset, len(binary))
+		self.buffer += binary
+		self.count += 1
+
+	@property
+	def size(self):
+		"""The current size of the bundle, in bytes
+		"""
+		return len(self.buffer)
+
+	def clear(self):
+		"""Remove all messages appended so far
+		"""
+		del self.buffer[self._headerSize:]
+		self.count = 0
+
+	def getBinary(self):
+		"""Returns the binary representation of the bundle. The returned bytearray is that of the
+		writer: it changes with later appends
+		"""
+		return self.buffer
+
+	def __len__(self):
+		"""Returns the number of messages appended so far
+		"""
+		return self.count
+
 ######
 #
 # OSCMessage encoding functions
@@ -770,6 +919,70 @@ def OSCArgument(next, typehint=None):
 
 	return (tag, binary)
 
+# struct.Struct objects used to pack homogeneous sequences, indexed by (tag, count)
+_packStructs = {}
+
+def _packRun(tag, values):
+	"""Pack a sequence of values of the numeric type 'tag' ('i', 'f' or 'd') in a single call
+	"""
+	key = (tag, len(values))
+	run = _packStructs.get(key)
+	if run == None:
+		run = struct.Struct(">%d%s" % (len(values), tag))
+		if len(_packStructs) < 1024:
+			_packStructs[key] = run
+
+	return run.pack(*values)
+
+def OSCNumericArray(next, typehint=None):
+	"""Convert a homogeneous sequence of numbers (list, tuple, array.array or numpy array)
+	to its OSC binary representation in a single pack call, returning a (typetags, data) tuple.
+	Returns None if 'next' is not such a sequence, or if 'typehint' does not apply to it
+	(the caller should then append its elements one-by-one)
+	"""
+	if typehint not in (None, 'i', 'f', 'd'):
+		return None
+
+	if isinstance(next, (list, tuple)):
+		kinds = set(map(type, next))
+		if not len(kinds):
+			return ("", b"")
+		elif kinds.issubset(FloatTypes):
+			tag = typehint or 'f'
+		elif kinds.issubset(IntTypes):
+			tag = typehint or 'i'
+		else:
+			return None
+
+		if tag == 'i':
+			return (tag * len(next), _packRun(tag, [int(v) for v in next]))
+		if not kinds.issubset((float, int)):
+			next = [float(v) for v in next]
+		return (tag * len(next), _packRun(tag, next))
+
+	if isinstance(next, array.array):
+		if next.typecode in 'fd':
+			tag = typehint or 'f'
+		elif next.typecode in 'bBhHiIlLqQ':
+			tag = typehint or 'i'
+		else:
+			return None
+
+		return (tag * len(next), _packRun(tag, [int(v) for v in next] if tag == 'i' else next.tolist()))
+
+	if (numpy != None) and isinstance(next, numpy.ndarray):
+		if next.dtype.kind == 'f':
+			tag = typehint or 'f'
+		elif next.dtype.kind in 'iu':
+			tag = typehint or 'i'
+		else:
+			return None
+
+		dtype = {'i':'>i4', 'f':'>f4', 'd':'>f8'}[tag]
+		return (tag * next.size, next.astype(dtype).tobytes())
+
+	return None
+
 def OSCTimeTag(time):
 	"""Convert a time in floating seconds to its
 	OSC binary representation
@@ -870,12 +1083,118 @@ def _readDouble(data):
 
 	return (float, rest)
 
-def decodeOSC(data):
-	"""Converts a binary OSC message to a Python list.
+def _readStringAt(data, offset, end):
+	"""Reads the (null-terminated) string starting at 'offset' in data.
+	Returns a (string, next offset) tuple
+	"""
+	length = data.find(b'\0', offset, end)
+	if length < 0:
+		length = end
+	return (data[offset:length].decode('latin1'), offset + ((length - offset) // 4 + 1) * 4)
+
+def _readBlobAt(data, offset, end, views=False):
+	"""Reads the (numbered) block of data starting at 'offset' in data.
+	Returns a (blob, next offset) tuple. If 'views' is True, the blob is a memoryview
+	on 'data' rather than a bytes copy
+	"""
+	length = _int32.unpack_from(data, offset)[0]
+	offset += 4
+	if views:
+		blob = memoryview(data)[offset:offset + length]
+	else:
+		blob = data[offset:offset + length]
+	return (blob, offset + ((length + 3) // 4) * 4)
+
+def _makeReaderAt(fmt, name):
+	"""Returns a reader of a fixed-size value starting at 'offset' in data,
+	returning a (value, next offset) tuple
 	"""
-	table = {"i":_readInt, "f":_readFloat, "s":_readString, "b":_readBlob, "d":_readDouble, "t":_readTimeTag}
-	decoded = []
-	address,  rest = _readString(data)
+	unpack_from = struct.Struct(fmt).unpack_from
+	size = struct.calcsize(fmt)
+
+	def _readAt(data, offset, end):
+		if offset + size > end:
+			print("Error: too few bytes for %s" % name, data[offset:end], end - offset)
+			return (0, offset)
+
+		return (unpack_from(data, offset)[0], offset + size)
+
+	return _readAt
+
+_int32 = struct.Struct(">i")
+_readIntAt = _makeReaderAt(">i", "int")
+_readFloatAt = _makeReaderAt(">f", "float")
+_readDoubleAt = _makeReaderAt(">d", "double")
+
+def _readTimeTagAt(data, offset, end):
+	"""Tries to interpret the 8 bytes starting at 'offset' in data as a TimeTag.
+	Returns a (time, next offset) tuple
+	"""
+	high, low = struct.unpack_from(">LL", data, offset)
+	if (high == 0) and (low <= 1):
+		time = 0.0
+	else:
+		time = int(NTP_epoch + high) + float(low / NTP_units_per_second)
+	return (time, offset + 8)
+
+# runs of identical numeric typetags, decoded with a single unpack call
+_tagRuns = re.compile(r"i+|f+|d+|.")
+
+# cache of struct.Struct objects for typetag runs, indexed by (tag, count)
+_runStructs = {}
+
+def _readRunAt(data, offset, end, tag, count):
+	"""Reads 'count' consecutive values of the numeric type 'tag' starting at 'offset' in data.
+	Returns a (list of values, next offset) tuple
+	"""
+	key = (tag, count)
+	run = _runStructs.get(key)
+	if run == None:
+		run = struct.Struct(">%d%s" % (count, tag))
+		if len(_runStructs) < 1024:
+			_runStructs[key] = run
+
+	if offset + run.size > end:
+		# not enough data: read values one-by-one (reports the error)
+		reader = {"i":_readIntAt, "f":_readFloatAt, "d":_readDoubleAt}[tag]
+		values = []
+		for i in range(count):
+			value, offset = reader(data, offset, end)
+			values.append(value)
+		return (values, offset)
+
+	return (list(run.unpack_from(data, offset)), offset + run.size)
+
+# array typecodes and numpy dtypes of numeric OSC typetags
+_arrayTypes = {"i":("i", ">i4", "int32"), "f":("f", ">f4", "float32"), "d":("d", ">f8", "float64")}
+
+def _readArrayAt(data, offset, end, tag, count):
+	"""Reads 'count' consecutive values of the numeric type 'tag' starting at 'offset' in data,
+	into a native-endian numpy array if numpy is available, or an array.array otherwise.
+	Returns an (array, next offset) tuple, or (None, offset) if data is too short
+	"""
+	(typecode, dtype, native) = _arrayTypes[tag]
+	size = count * (8 if tag == "d" else 4)
+	if offset + size > end:
+		return (None, offset)
+
+	if numpy != None:
+		values = numpy.frombuffer(data, dtype=dtype, count=count, offset=offset).astype(native)
+	else:
+		values = array.array(typecode)
+		values.frombytes(data[offset:offset + size])
+		if sys.byteorder == "little":
+			values.byteswap()
+
+	return (values, offset + size)
+
+def _decodePacketAt(data, offset, end, views, asarray=False):
+	"""Decodes the OSC-packet held in data[offset:end], without copying 'data'.
+	See decodeOSCPacket() for the returned value
+	"""
+	table = {"i":_readIntAt, "f":_readFloatAt, "s":_readStringAt, "d":_readDoubleAt, "t":_readTimeTagAt}
+
+	address, offset = _readStringAt(data, offset, end)
 	if address.startswith(","):
 		typetags = address
 		address = ""
@@ -883,27 +1202,83 @@ def decodeOSC(data):
 		typetags = ""
 
 	if address == "#bundle":
-		time, rest = _readTimeTag(rest)
-		decoded.append(address)
-		decoded.append(time)
-		while len(rest)>0:
-			length, rest = _readInt(rest)
-			decoded.append(decodeOSC(rest[:length]))
-			rest = rest[length:]
-
-	elif len(rest)>0:
-		if not len(typetags):
-			typetags, rest = _readString(rest)
-		decoded.append(address)
-		decoded.append(typetags)
-		if typetags.startswith(","):
-			for tag in typetags[1:]:
-				value, rest = table[tag](rest)
-				decoded.append(value)
+		time, offset = _readTimeTagAt(data, offset, end)
+		packets = []
+		while offset + 4 <= end:
+			length, offset = _readIntAt(data, offset, end)
+			if (length < 0) or (offset + length > end):
+				# malformed element size: drop the rest of the bundle
+				break
+			packets.append(_decodePacketAt(data, offset, min(offset + length, end), views, asarray))
+			offset += length
+
+		return (address, time, packets)
+
+	if offset >= end:
+		return None
+
+	if not len(typetags):
+		typetags, offset = _readStringAt(data, offset, end)
+
+	if not typetags.startswith(","):
+		raise OSCError("OSCMessage's typetag-string lacks the magic ','")
+
+	tags = typetags[1:]
+	if asarray and len(tags) and (tags[0] in _arrayTypes) and (tags.count(tags[0]) == len(tags)):
+		values, _ = _readArrayAt(data, offset, end, tags[0], len(tags))
+		if values is not None:
+			return (address, typetags, values)
+
+	args = []
+	for run in _tagRuns.finditer(tags):
+		tag = run.group()
+		count = len(tag)
+		if count > 1:
+			values, offset = _readRunAt(data, offset, end, tag[0], count)
+			args.extend(values)
+		elif tag == "b":
+			value, offset = _readBlobAt(data, offset, end, views)
+			args.append(value)
 		else:
-			raise OSCError("OSCMessage's typetag-string lacks the magic ','")
+			value, offset = table[tag](data, offset, end)
+			args.append(value)
+
+	return (address, typetags, args)
+
+def decodeOSCPacket(data, views=False, asarray=False):
+	"""Converts a binary OSC packet to a nested tuple, walking the packet with an integer offset
+	(the packet is never sliced). Runs of identical numeric typetags (e.g. ',ffff') are decoded
+	with a single unpack call.
+	  - data: bytes-like object holding the packet
+	  - views (bool): if True, blobs are returned as memoryviews on 'data' rather than bytes copies
+	  - asarray (bool): if True, the arguments of messages whose typetags are all the same numeric
+	  type ('i', 'f' or 'd') are returned as a numpy array (or an array.array if numpy is not
+	  available) rather than a list
+	Returns:
+	  - (address, typetags, [arguments]) for an OSC-message
+	  - ('#bundle', timetag, [packets]) for an OSC-bundle, each packet decoded the same way
+	  - None for an empty OSC-message
+	"""
+	if isinstance(data, memoryview):
+		data = data.tobytes()
 
-	return decoded
+	return _decodePacketAt(data, 0, len(data), views, asarray)
+
+def _flattenPacket(packet):
+	"""Converts a packet returned by decodeOSCPacket() to the decodeOSC() list format
+	"""
+	if packet == None:
+		return []
+
+	if packet[0] == "#bundle":
+		return [packet[0], packet[1]] + [_flattenPacket(p) for p in packet[2]]
+
+	return [packet[0], packet[1]] + packet[2]
+
+def decodeOSC(data):
+	"""Converts a binary OSC message to a Python list.
+	"""
+	return _flattenPacket(decodeOSCPacket(data))
 
 ######
 #
@@ -1154,8 +1529,8 @@ class OSCClient(object):
 		  	this call blocks until socket is available for writing.
 		Raises OSCClientError when timing out while waiting for the socket.
 		"""
-		if not isinstance(msg, OSCMessage):
-			raise TypeError("'msg' argument is not an OSCMessage or OSCBundle object")
+		if not isinstance(msg, (OSCMessage, OSCBundleWriter)):
+			raise TypeError("'msg' argument is not an OSCMessage, OSCBundle or OSCBundleWriter object")
 
 		ret = select.select([],[self._fd], [], timeout)
 		try:
@@ -1180,6 +1555,22 @@ class OSCClient(object):
 			else:
 				raise OSCClientError("while sending to %s: %s" % (str(address), str(e)))
 
+	def sendConnected(self, msg, address):
+		"""Send the given OSCMessage to the specified address.
+		If the Client is connected to this address (see connect()), the message is written with a
+		single send() call: no select(), no (re)connect. Otherwise falls back to sendto().
+		  - msg:  OSCMessage (or OSCBundle) to be sent
+		  - address:  (host, port) tuple specifing remote server to send the message to
+		Raises OSCClientError when the message could not be sent.
+		"""
+		if address != self.client_address:
+			return self.sendto(msg, address)
+
+		try:
+			self.socket.send(msg.getBinary())
+		except socket.error as e:
+			raise OSCClientError("while sending to %s: %s" % (str(address), str(e)))
+
 	def send(self, msg, timeout=None):
 		"""Send the given OSCMessage.
 		The Client must be already connected.
@@ -1189,8 +1580,8 @@ class OSCClient(object):
 		Raises OSCClientError when timing out while waiting for the socket,
 		or when the Client isn't connected to a remote server.
 		"""
-		if not isinstance(msg, OSCMessage):
-			raise TypeError("'msg' argument is not an OSCMessage or OSCBundle object")
+		if not isinstance(msg, (OSCMessage, OSCBundleWriter)):
+			raise TypeError("'msg' argument is not an OSCMessage, OSCBundle or OSCBundleWriter object")
 
 		ret = select.select([],[self._fd], [], timeout)
 		try:
@@ -1286,8 +1677,13 @@ def getFilterStr(filters):
 # A translation-table for mapping OSC-address expressions to Python 're' expressions
 OSCtrans = str.maketrans("{,}?","(|).")
 
+# Characters that make an address-pattern differ from a plain address when translated by getRegEx()
+OSCpatternChars = re.compile(r"[*?,\[\]{}+^$|\\]")
+
+@lru_cache(maxsize=256)
 def getRegEx(pattern):
 	"""Compiles and returns a 'regular expression' object for the given address-pattern.
+	Compiled expressions of the last 256 patterns are cached.
 	"""
 	# Translate OSC-address syntax to python 're' syntax
 	pattern = pattern.replace(".", r"\.")		# first, escape all '.'s in the pattern.
@@ -1667,9 +2063,132 @@ class OSCMultiClient(OSCClient):
 				else:
 					raise OSCClientError("while sending to %s: %s" % (str(address), str(e)))
 
+class OSCTrieNode:
+	"""Node of an OSCAddressTrie: children per address segment, '*' child, and handlers
+	"""
+	__slots__ = ('children', 'wildcard', 'handler', 'tailHandler')
+
+	def __init__(self):
+		self.children = {}
+		self.wildcard = None
+		self.handler = None
+		self.tailHandler = None
+
+class OSCAddressTrie:
+	"""Segment trie of OSC-address templates and their handlers.
+	A template is an OSC-address whose segments may be '*' (matching any one segment), the last
+	segment may be '**' (matching all remaining segments, at least one).
+	Matching an OSC-address walks the trie one address segment at a time, its cost depends on
+	the address depth, not on the number of registered templates. Exact segments are preferred
+	over '*', and '*' over '**'.
+	"""
+	def __init__(self):
+		self.root = OSCTrieNode()
+		self.size = 0
+
+	def add(self, template, handler):
+		"""Register handler for OSC-address template, replace previous one if any
+		"""
+		segments = template.strip('/').split('/')
+		node = self.root
+		for i in range(len(segments)):
+			segment = segments[i]
+			if segment == '**':
+				if i != len(segments) - 1:
+					raise OSCServerError("'**' may only be the last segment of an OSC-address template")
+				if node.tailHandler == None:
+					self.size += 1
+				node.tailHandler = handler
+				return
+			elif segment == '*':
+				if node.wildcard == None:
+					node.wildcard = OSCTrieNode()
+				node = node.wildcard
+			else:
+				if segment not in node.children:
+					node.children[segment] = OSCTrieNode()
+				node = node.children[segment]
+
+		if node.handler == None:
+			self.size += 1
+		node.handler = handler
+
+	def remove(self, template):
+		"""Remove handler registered for OSC-address template, raise KeyError if none
+		"""
+		segments = template.strip('/').split('/')
+		node = self.root
+		for segment in segments[:-1]:
+			if segment == '*':
+				node = node.wildcard
+			else:
+				node = node.children.get(segment)
+			if node == None:
+				raise KeyError(template)
+
+		if segments[-1] == '**':
+			if node.tailHandler == None:
+				raise KeyError(template)
+			node.tailHandler = None
+		else:
+			if segments[-1] == '*':
+				node = node.wildcard
+			else:
+				node = node.children.get(segments[-1])
+			if node == None or node.handler == None:
+				raise KeyError(template)
+			node.handler = None
+
+		self.size -= 1
+
+	def match(self, address):
+		"""Returns (handler, segments) for the template matching the given OSC-address, where
+		'segments' is the list of address segments matched by '*' (and the remainder of the
+		address matched by '**', as a string), or (None, None) if no template matches.
+		"""
+		segments = address.strip('/').split('/')
+		captures = []
+		handler = self._match(self.root, segments, 0, captures)
+		if handler == None:
+			return (None, None)
+
+		return (handler, captures)
+
+	def _match(self, node, segments, index, captures):
+		"""Recursive matching function, returns handler or None
+		"""
+		if index == len(segments):
+			return node.handler
+
+		segment = segments[index]
+		child = node.children.get(segment)
+		if child != None:
+			handler = self._match(child, segments, index + 1, captures)
+			if handler != None:
+				return handler
+
+		if node.wildcard != None:
+			captures.append(segment)
+			handler = self._match(node.wildcard, segments, index + 1, captures)
+			if handler != None:
+				return handler
+			captures.pop()
+
+		if node.tailHandler != None:
+			captures.append('/'.join(segments[index:]))
+			return node.tailHandler
+
+		return None
+
 class OSCAddressSpace:
+	# max number of address-patterns whose matching OSC-addresses are cached (see dispatchMessage)
+	dispatch_cache_size = 256
+
 	def __init__(self):
 		self.callbacks = {}
+		self.segmentCallbacks = OSCAddressTrie()
+		self._dispatchCache = OrderedDict()
+
 	def addMsgHandler(self, address, callback):
 		"""Register a handler for an OSC-address
 		  - 'address' is the OSC address-string.
@@ -1688,23 +2207,81 @@ class OSCAddressSpace:
 			address = '/' + address.strip('/')
 
 		self.callbacks[address] = callback
+		self._dispatchCache.clear()
 
 	def delMsgHandler(self, address):
 		"""Remove the registered handler for the given OSC-address
 		"""
 		del self.callbacks[address]
+		self._dispatchCache.clear()
+
+	def addSegmentHandler(self, template, callback):
+		"""Register a handler for all OSC-addresses matching an address template
+		  - 'template' is an OSC-address whose segments may be '*' (matches any one segment),
+		the last one may be '**' (matches all remaining segments). See OSCAddressTrie.
+		  - 'callback' is the function called for incoming OSCMessages that match 'template'.
+		It is called with the same arguments as handlers registered with addMsgHandler, plus the
+		list of address segments matched by the '*' (and '**') segments of 'template'.
+		Segment handlers take precedence: a message matching one is not dispatched to handlers
+		registered with addMsgHandler.
+		"""
+		for chk in '?,[]{}# ':
+			if chk in template:
+				raise OSCServerError("OSC-address template may not contain any characters in '?,[]{}# '")
+
+		if type(callback) not in (types.FunctionType, types.MethodType):
+			raise OSCServerError("Message callback '%s' is not callable" % repr(callback))
+
+		self.segmentCallbacks.add(template, callback)
+
+	def delSegmentHandler(self, template):
+		"""Remove the registered handler for the given OSC-address template
+		"""
+		self.segmentCallbacks.remove(template)
 
 	def getOSCAddressSpace(self):
 		"""Returns a list containing all OSC-addresses registerd with this Server.
 		"""
 		return list(self.callbacks.keys())
 
+	def getMatchingAddresses(self, pattern):
+		"""Returns the list of registered OSC-addresses matching the given OSC-address pattern.
+		Patterns without wildcards are looked up directly, others are matched against all
+		registered addresses. Results are kept in a LRU cache of 'dispatch_cache_size' patterns,
+		cleared whenever a handler is added or removed.
+		"""
+		cache = self._dispatchCache
+		addrs = cache.get(pattern)
+		if addrs != None:
+			cache.move_to_end(pattern)
+			return addrs
+
+		if OSCpatternChars.search(pattern) == None:
+			if pattern in self.callbacks:
+				addrs = [pattern]
+			else:
+				addrs = []
+		else:
+			expr = getRegEx(pattern)
+			addrs = []
+			for addr in self.callbacks.keys():
+				match = expr.match(addr)
+				if match and (match.end() == len(addr)):
+					addrs.append(addr)
+
+		cache[pattern] = addrs
+		if len(cache) > self.dispatch_cache_size:
+			cache.popitem(last=False)
+
+		return addrs
+
 	def dispatchMessage(self, pattern, tags, data, client_address):
 		"""Attmept to match the given OSC-address pattern, which may contain '*',
 		against all callbacks registered with the OSCServer.
 		Calls the matching callback and returns whatever it returns.
 		If no match is found, and a 'default' callback is registered, it calls that one,
 		or raises NoCallbackError if a 'default' callback is not registered.
+		Handlers registered with addSegmentHandler are looked up first (see OSCAddressTrie).
 
 		  - pattern (string):  The OSC-address of the receied message
 		  - tags (string):  The OSC-typetags of the receied message's arguments, without ','
@@ -1713,19 +2290,25 @@ class OSCAddressSpace:
 		if len(tags) != len(data):
 			raise OSCServerError("Malformed OSC-message; got %d typetags [%s] vs. %d values" % (len(tags), tags, len(data)))
 
-		expr = getRegEx(pattern)
+		if self.segmentCallbacks.size > 0:
+			(callback, segments) = self.segmentCallbacks.match(pattern)
+			if callback != None:
+				reply = callback(pattern, tags, data, client_address, segments)
+				if isinstance(reply, OSCMessage):
+					return [reply]
+				elif reply != None:
+					raise TypeError("Message-callback %s did not return OSCMessage or None: %s" % (callback, type(reply)))
+				return []
 
 		replies = []
 		matched = 0
-		for addr in list(self.callbacks.keys()):
-			match = expr.match(addr)
-			if match and (match.end() == len(addr)):
-				reply = self.callbacks[addr](pattern, tags, data, client_address)
-				matched += 1
-				if isinstance(reply, OSCMessage):
-					replies.append(reply)
-				elif reply != None:
-					raise TypeError("Message-callback %s did not return OSCMessage or None: %s" % (self.server.callbacks[addr], type(reply)))
+		for addr in self.getMatchingAddresses(pattern):
+			reply = self.callbacks[addr](pattern, tags, data, client_address)
+			matched += 1
+			if isinstance(reply, OSCMessage):
+				replies.append(reply)
+			elif reply != None:
+				raise TypeError("Message-callback %s did not return OSCMessage or None: %s" % (self.server.callbacks[addr], type(reply)))
 
 		if matched == 0:
 			if 'default' in self.callbacks:
@@ -1756,24 +2339,32 @@ class OSCRequestHandler(DatagramRequestHandler):
 		self.replies = []
 
 	def _unbundle(self, decoded):
-		"""Recursive bundle-unpacking function"""
+		"""Recursive bundle-unpacking function
+		'decoded' is a packet as returned by decodeOSCPacket()
+		"""
+		if decoded == None:
+			return
+
 		if decoded[0] != "#bundle":
-			self.replies += self.server.dispatchMessage(decoded[0], decoded[1][1:], decoded[2:], self.client_address)
+			self.replies += self.server.dispatchMessage(decoded[0], decoded[1][1:], decoded[2], self.client_address)
 			return
 
 		now = time.time()
 		timetag = decoded[1]
 		if (timetag > 0.) and (timetag > now):
+			if self.server.schedule_bundles:
+				self.server.schedule_bundle(timetag, decoded, self.client_address)
+				return
 			time.sleep(timetag - now)
 
-		for msg in decoded[2:]:
+		for msg in decoded[2]:
 			self._unbundle(msg)
 
 	def handle(self):
 		"""Handle incoming OSCMessage
 		"""
-		decoded = decodeOSC(self.packet)
-		if not len(decoded):
+		decoded = decodeOSCPacket(self.packet, asarray=self.server.decode_arrays)
+		if decoded == None:
 			return
 
 		self._unbundle(decoded)
@@ -1806,19 +2397,25 @@ class ThreadingOSCRequestHandler(OSCRequestHandler):
 		This version starts a new thread for each sub-Bundle found in the Bundle,
 		then waits for all its children to finish.
 		"""
+		if decoded == None:
+			return
+
 		if decoded[0] != "#bundle":
-			self.replies += self.server.dispatchMessage(decoded[0], decoded[1][1:], decoded[2:], self.client_address)
+			self.replies += self.server.dispatchMessage(decoded[0], decoded[1][1:], decoded[2], self.client_address)
 			return
 
 		now = time.time()
 		timetag = decoded[1]
 		if (timetag > 0.) and (timetag > now):
+			if self.server.schedule_bundles:
+				self.server.schedule_bundle(timetag, decoded, self.client_address)
+				return
 			time.sleep(timetag - now)
 			now = time.time()
 
 		children = []
 
-		for msg in decoded[2:]:
+		for msg in decoded[2]:
 			t = threading.Thread(target = self._unbundle, args = (msg,))
 			t.start()
 			children.append(t)
@@ -1850,6 +2447,16 @@ class OSCServer(UDPServer, OSCAddressSpace):
 	# DEBUG: print error-tracebacks (to stderr)?
 	print_tracebacks = False
 
+	# maximum size (in bytes) of received packets held in the local backlog (see handle_pending_requests())
+	max_backlog_size = 1 << 20
+
+	# pass arguments of homogeneous numeric messages to callbacks as arrays (see decodeOSCPacket())
+	decode_arrays = False
+
+	# queue bundles timetagged in the future, to be dispatched once due by handle_pending_requests()
+	# or dispatch_due_bundles(), rather than sleeping in the request handler until they are due
+	schedule_bundles = False
+
 	def __init__(self, server_address, client=None, return_port=0, max_packet_size=8192):
 		"""Instantiate an OSCServer.
 		  - server_address ((host, port) tuple): the local host & UDP-port
@@ -1872,6 +2479,15 @@ class OSCServer(UDPServer, OSCAddressSpace):
 		self.running = False
 		self.client = None
 
+		# packets read from the socket but not handled yet, and their total size (in bytes)
+		self._backlog = deque()
+		self._backlogSize = 0
+
+		# heap of (timetag, count, decoded bundle, client address) of bundles due in the future
+		self._scheduled = []
+		self._scheduleCounter = itertools.count()
+		self._scheduleLock = threading.Lock()
+
 		if client == None:
 			self.client = OSCClient(server=self)
 		else:
@@ -1913,10 +2529,158 @@ class OSCServer(UDPServer, OSCAddressSpace):
 		while self.running:
 			self.handle_request()	# this times-out when no data arrives.
 
+	def _readPendingRequests(self, deadline=None):
+		"""Read the datagrams currently waiting on the server socket into the local backlog,
+		without blocking and without decoding them, until the backlog holds 'max_backlog_size'
+		bytes or until 'deadline' (a time.perf_counter() value) is reached.
+		Returns the number of datagrams read.
+		"""
+		count = 0
+		self.socket.setblocking(False)
+		try:
+			while self._backlogSize < self.max_backlog_size:
+				try:
+					request = self.get_request()
+				except OSError:		# no more data (BlockingIOError) or socket error
+					break
+
+				self._backlog.append(request)
+				self._backlogSize += len(request[0][0])
+				count += 1
+
+				if (deadline != None) and (time.perf_counter() >= deadline):
+					break
+		finally:
+			self.socket.settimeout(self.socket_timeout)
+
+		return count
+
+	def handle_pending_requests(self, time_budget=None, wait=0):
+		"""Handle all pending requests, without blocking.
+		Datagrams waiting on the socket are first read into a local backlog, then the backlog
+		is handled one packet at a time until it is empty or until 'time_budget' is spent.
+		Packets left in the backlog (or on the socket) are handled first on the next call.
+		  - time_budget (float): maximum time spent reading and handling packets, in seconds.
+		  If time_budget == None, the whole backlog is handled.
+		  - wait (float): if no packet is pending, maximum time to wait for one, in seconds.
+		Returns a (handled, pending) tuple: the number of packets handled during this call,
+		and the number of packets still waiting in the backlog.
+		"""
+		if (wait > 0) and not len(self._backlog):
+			due = self.next_bundle_time()
+			if due != None:
+				wait = max(0., min(wait, due - time.time()))
+			select.select([self.socket], [], [], wait)
+
+		self.dispatch_due_bundles()
+
+		start = time.perf_counter()
+		deadline = None if time_budget == None else start + time_budget
+		self._readPendingRequests(deadline)
+
+		handled = 0
+		while len(self._backlog):
+			(request, client_address) = self._backlog.popleft()
+			self._backlogSize -= len(request[0])
+			if self.verify_request(request, client_address):
+				try:
+					self.process_request(request, client_address)
+				except Exception:
+					self.handle_error(request, client_address)
+					self.shutdown_request(request)
+			else:
+				self.shutdown_request(request)
+
+			handled += 1
+			if (deadline != None) and (time.perf_counter() >= deadline):
+				break
+
+		return (handled, len(self._backlog))
+
+	def schedule_bundle(self, timetag, decoded, client_address):
+		"""Queue a bundle to be dispatched once 'timetag' is due (see dispatch_due_bundles())
+		  - timetag (float): the bundle timetag, in 'Python Time'
+		  - decoded: the bundle, as returned by decodeOSCPacket()
+		  - client_address ((host, port) tuple): the address of the client that sent it
+		"""
+		with self._scheduleLock:
+			heapq.heappush(self._scheduled, (timetag, next(self._scheduleCounter), decoded, client_address))
+
+	def next_bundle_time(self):
+		"""Returns the timetag of the next scheduled bundle, or None if no bundle is scheduled
+		"""
+		with self._scheduleLock:
+			if len(self._scheduled):
+				return self._scheduled[0][0]
+
+		return None
+
+	def dispatch_due_bundles(self, now=None):
+		"""Dispatch the messages of all scheduled bundles whose timetag is due, in timetag order.
+		Nested bundles due later are scheduled again. Replies are sent back to the client
+		that sent the bundle.
+		  - now (float): the current time, in 'Python Time'. If now == None, time.time() is used.
+		Returns the number of bundles dispatched.
+		"""
+		if now == None:
+			now = time.time()
+
+		dispatched = 0
+		while True:
+			with self._scheduleLock:
+				if not len(self._scheduled) or (self._scheduled[0][0] > now):
+					break
+				(timetag, count, decoded, client_address) = heapq.heappop(self._scheduled)
+
+			replies = []
+			try:
+				self._dispatchBundle(decoded, client_address, replies, now)
+				self._sendReplies(replies, client_address)
+			except Exception:
+				self.handle_error(None, client_address)
+
+			dispatched += 1
+
+		return dispatched
+
+	def _dispatchBundle(self, decoded, client_address, replies, now):
+		"""Recursive dispatch function for scheduled bundles
+		"""
+		for packet in decoded[2]:
+			if packet == None:
+				continue
+			elif packet[0] != "#bundle":
+				replies += self.dispatchMessage(packet[0], packet[1][1:], packet[2], client_address)
+			elif (packet[1] > 0.) and (packet[1] > now):
+				self.schedule_bundle(packet[1], packet, client_address)
+			else:
+				self._dispatchBundle(packet, client_address, replies, now)
+
+	def _sendReplies(self, replies, client_address):
+		"""Send replies returned by callbacks back to client, as an OSCMessage or OSCBundle
+		"""
+		if self.return_port:
+			client_address = (client_address[0], self.return_port)
+
+		if len(replies) > 1:
+			msg = OSCBundle()
+			for reply in replies:
+				msg.append(reply)
+		elif len(replies) == 1:
+			msg = replies[0]
+		else:
+			return
+
+		self.client.sendto(msg, client_address)
+
 	def close(self):
 		"""Stops serving requests, closes server (socket), closes used client
 		"""
 		self.running = False
+		self._backlog.clear()
+		self._backlogSize = 0
+		with self._scheduleLock:
+			self._scheduled = []
 		self.client.close()
 		self.server_close()
 
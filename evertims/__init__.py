@@ -1,7 +1,8 @@
 import bpy
 from types import MethodType
 from .evertClass import *
-from . import OSC
+from .evertExport import ( OscTextWriter, OscPacketLogWriter )
+from .evertReplay import isLogFile
 from .. import utils
 
 # ############################################################
@@ -25,9 +26,10 @@ class Evertims(AbstractOscSender):
         self.rooms = dict()
         self.sources = dict()
         self.listeners = dict()
-
-        # init OSC client (sender)
-        self.oscClient = OSC.OSCClient()
+        self.sendQueue = OscSendQueue()
+        self.maxBulkSizePerTick = 0
+        self.useSendThread = False
+        self.sendThread = None
 
 
     # get current configuration from UI
@@ -45,18 +47,28 @@ class Evertims(AbstractOscSender):
         self.soundVelocity = config.sound_velocity
         self.drawRays = config.draw_rays
         self.drawOrderMax = config.draw_order_max
+        self.receiveTimeBudget = config.receive_time_budget / 1000.0
+        self.useReceiveThread = config.receive_thread
 
         # save materials
         self.materials = utils.str2matDict(config.materials)
 
-        # init local OSC sender
+        # init local OSC sender: messages of all senders are queued during a tick, and sent
+        # at its end packed into bundles of at most maxBundleSize bytes (see flushSendQueue)
         self.initOsc(config.ip_remote, config.port_write)
+        self.maxBundleSize = config.osc_bundle_size
+        self.maxBulkSizePerTick = config.osc_bulk_size
+        self.useSendThread = config.send_thread
+        self.sendQueue = OscSendQueue()
+        self.osc['queue'] = self.sendQueue
 
         # init ray manager
         if( self.drawRays ):
             self.rayManager = RayManager( (config.ip_local, config.port_read) )
             self.rayManager.dbg = self.dbg
             self.rayManager.drawOrderMax = self.drawOrderMax
+            self.rayManager.receiveTimeBudget = self.receiveTimeBudget
+            self.rayManager.useReceiveThread = self.useReceiveThread
 
         # init scene objects: rooms
         roomGroupName = config.room_group
@@ -76,18 +88,21 @@ class Evertims(AbstractOscSender):
             obj.id = 1
             obj.dbg = self.dbg
             obj.initOsc(config.ip_remote, config.port_write)
+            obj.osc['queue'] = self.sendQueue
             obj.setMoveThreshold(config.update_thresh_loc, config.update_thresh_rot)
 
         for obj in self.listeners.values():
             obj.id = 1
             obj.dbg = self.dbg
             obj.initOsc(config.ip_remote, config.port_write)
+            obj.osc['queue'] = self.sendQueue
             obj.setMoveThreshold(config.update_thresh_loc, config.update_thresh_rot)
 
         for obj in self.rooms.values():
             obj.id = 1
             obj.dbg = self.dbg
             obj.initOsc(config.ip_remote, config.port_write)
+            obj.osc['queue'] = self.sendQueue
             obj.udpateInterval = config.update_thresh_time
 
         # init source directivity (not per-sourec management for now)
@@ -117,6 +132,12 @@ class Evertims(AbstractOscSender):
         # start ray tracer (before any other not to miss any incomming packet)
         if( self.drawRays ): self.rayManager.start()
 
+        # start send thread
+        if( self.useSendThread ):
+            self.sendThread = OscSendThread(self.sendBatch)
+            self.sendThread.start()
+            if self.dbg: print(__name__, 'started send thread')
+
         # pass material definition to client
         for key in self.materials:
             mat = self.materials[key]
@@ -138,7 +159,10 @@ class Evertims(AbstractOscSender):
         for obj in self.rooms.values(): obj.start()
 
         # define source directivity (@todo: multiple source support)
-        self.send('source/1/selectivity', self.sourceDirectivityValues)
+        self.send('source/1/selectivity', self.sourceDirectivityValues, coalesce = True)
+
+        # send queued messages
+        self.flushSendQueue(self.maxBulkSizePerTick)
 
     # stop auralization
     def stop(self):
@@ -157,6 +181,18 @@ class Evertims(AbstractOscSender):
         # stop ray tracer
         if( self.drawRays ): self.rayManager.stop()
 
+        # send all queued messages (waiting for room in send thread queue if need be)
+        self.flushSendQueue(None, True)
+
+        # stop send thread (once queued messages are sent)
+        if( self.sendThread is not None ):
+            self.sendThread.stop()
+            if self.dbg: print(__name__, 'stopped send thread: sent', self.sendThread.numSent, 'messages,', self.sendThread.numRefused, 'deferred (queue full),', self.sendThread.numFailed, 'failed')
+            self.sendThread = None
+
+        # release shared osc client
+        self.releaseOsc()
+
 
     # running callback
     def update(self):
@@ -166,37 +202,126 @@ class Evertims(AbstractOscSender):
         for obj in self.listeners.values(): obj.update()
         for obj in self.rooms.values(): obj.update()
 
+        # send queued messages (room definition spread over ticks if large)
+        self.flushSendQueue(self.maxBulkSizePerTick)
+
         # update ray tracer
         if( self.drawRays ): self.rayManager.update()
 
 
-    # export scene to disk as list of osc messages
-    def exportSceneAsOscList(self, config):
+    # send messages queued by all senders since last flush, packed into bundles. bulk messages
+    # (room geometry) limited to maxBulkSize bytes, all sent if None. block: wait for room in
+    # send thread queue (up to its timeout) rather than deferring messages to next flush
+    def flushSendQueue(self, maxBulkSize, block = False):
 
-        # create/clear file
-        filePath = bpy.path.abspath(config.export_file_path)
-        f = open(filePath,"w+")
-        f.write('')
-        f.close
+        msgs = self.sendQueue.pop(maxBulkSize)
+        if( not msgs ): return
+
+        # hand messages over to send thread. thread queue full: requeue messages, sent on next
+        # flush (never dropped: room face cache assumes queued faces reach the client). thread
+        # not running: messages sent from main thread
+        if( self.sendThread is not None and self.sendThread.isAlive() ):
+            if( not self.sendThread.put(msgs, block) ):
+                self.sendQueue.requeue(msgs)
+                if self.dbg: print(__name__, 'warning: send queue full (' + str(self.sendThread.getQueueDepth()) + ' updates pending),', len(msgs), 'messages deferred to next update')
+            return
+
+        self.sendBatch(msgs)
+
+    # send list of messages popped from send queue, packed into bundles
+    def sendBatch(self, msgs):
+
+        self.beginBundle()
+        for msg in msgs: self.sendToAddress(msg[0], msg[1])
+        self.endBundle()
+
+
+    # export scene to disk as list of osc messages: text file (.txt) of spat5.evert messages, or
+    # binary log (.osclog) of the OSC packets sent to the client (see evertReplay)
+    def exportSceneAsOscList(self, config):
 
         # init
         self.setup(config)
 
-        # prevent ray drawing: save draw state, set to false
+        # prevent ray drawing and send thread: save draw state, set to false. no room upload
+        # budget: room written whole before stop messages
         drawRays = self.drawRays
         self.drawRays = False
+        self.useSendThread = False
+        self.maxBulkSizePerTick = 0
 
-        # switch osc send callbacks to write to disk. using "MethodType" truly bounds
+        # create/clear file, opened once for the whole export
+        filePath = bpy.path.abspath(config.export_file_path)
+
+        # packet log: packets sent to client (through send queue) written to disk instead. no
+        # timestamps: static snapshot, packets are all sent at once (see exportAnimationAsOscLog)
+        if( isLogFile(filePath) ):
+            writer = OscPacketLogWriter(filePath, False)
+            self.osc['writer'] = writer
+
+        # text: switch osc send callbacks to write to disk. using "MethodType" truly bounds
         # the method to the class, i.e. passing it "self" upon execution
-        self.send = MethodType(sendToDisk, self)
-        for obj in self.rooms.values(): obj.send = MethodType(sendToDisk, obj)
-        for obj in self.sources.values(): obj.send = MethodType(sendToDisk, obj)
-        for obj in self.listeners.values(): obj.send = MethodType(sendToDisk, obj)
+        else:
+            writer = OscTextWriter(filePath)
+            senders = [self] + list(self.rooms.values()) + list(self.sources.values()) + list(self.listeners.values())
+            for obj in senders:
+                obj.send = MethodType(sendToDisk, obj)
+                obj.sendTemplate = MethodType(sendTemplateToDisk, obj)
+                obj.osc['writer'] = writer
 
         # run full auralization sequence
-        self.start()
-        self.update()
-        self.stop()
+        try:
+            self.start()
+            self.update()
+            self.stop()
+        finally:
+            writer.close()
+            self.osc['writer'] = None
+
+        # restore config
+        self.drawRays = drawRays
+
+
+    # export scene animation over scene frame range to disk as a packet log (see evertReplay),
+    # timestamped with frame time: room is defined on first frame, then only source / listener
+    # transforms and room faces that changed are written on each frame
+    def exportAnimationAsOscLog(self, config):
+
+        # init
+        scene = bpy.context.scene
+        self.setup(config)
+
+        # prevent ray drawing and send thread, send everything on each frame (no room upload
+        # budget nor room update throttle, both based on wall-clock time)
+        drawRays = self.drawRays
+        self.drawRays = False
+        self.useSendThread = False
+        self.maxBulkSizePerTick = 0
+        for obj in self.rooms.values():
+            obj.udpateInterval = 0
+            obj.pollGeometry = True # no depsgraph update callback on frame change: diff room on each frame
+
+        # create/clear file, packets written (streamed) frame by frame
+        filePath = bpy.path.abspath(config.export_file_path)
+        writer = OscPacketLogWriter(filePath, True)
+        self.osc['writer'] = writer
+
+        # locals
+        frameCurrent = scene.frame_current
+        fps = scene.render.fps / scene.render.fps_base
+
+        # run auralization sequence over frame range
+        try:
+            for frame in range(scene.frame_start, scene.frame_end + 1):
+                scene.frame_set(frame)
+                writer.time = (frame - scene.frame_start) / fps
+                if( frame == scene.frame_start ): self.start()
+                self.update()
+            self.stop()
+        finally:
+            writer.close()
+            self.osc['writer'] = None
+            scene.frame_set(frameCurrent)
 
         # restore config
         self.drawRays = drawRays
@@ -217,42 +342,24 @@ class EvertMaterial():
         self.scatterings = []
 
 
-# method replacing the "send" method of all AbstractOscSenders, writing to disk instead
-# of sending OSC message
-def sendToDisk(self, header, content = None):
+# method replacing the "send" method of all AbstractOscSenders, writing to disk (through the
+# writer set in osc['writer']) instead of sending OSC message
+def sendToDisk(self, header, content = None, coalesce = False):
+    writeToDisk(self, self.getOscHeader() + "/" + header, content)
+
+# method replacing the "sendTemplate" method of all AbstractOscSenders, see sendToDisk
+def sendTemplateToDisk(self, template, values, coalesce = False):
 
-    # open file
-    filePath = bpy.path.abspath(bpy.context.scene.evertims.export_file_path)
-    f = open(filePath,"a")
+    # single value templates written as single value messages
+    if( len(values) == 1 ): values = values[0]
+    writeToDisk(self, template.address, values)
 
-    # create header
-    header = self.getOscHeader() + "/" + header
+def writeToDisk(self, address, content):
 
     # filter message list (only interested in spat5.evert messages, not those that control
     # the rest of the client behavior)
     discardList = ['dsp', 'destroy']
-    if( any(s in header for s in discardList) ): return
-
-    # shape message
-    if( content == None ):
-        msg = header
-
-    else:
-
-        # shape content in case of tuple or list
-        if( isinstance(content, list) or isinstance(content, tuple) ):
-            contentStr = ''
-            for i in range(len(content)):
-                contentStr = contentStr + ' ' + str(round(content[i],4)) # avoid outputs like 1e-6
-
-        # default shape content
-        else:
-            contentStr = str(content)
-
-        msg = header + ' ' + contentStr
+    if( any(s in address for s in discardList) ): return
 
     # write to file
-    f.write(msg + "\n")
-
-    # close file
-    f.close()
+    self.osc['writer'].write(address, content)
@@ -1,4 +1,7 @@
 from . import ( OSC, evertUtils )
+from collections import deque
+import queue
+import threading
 
 
 # ############################################################
@@ -11,6 +14,238 @@ class AbstractBase():
     def __init__(self):
         self.dbg = False
 
+# pool of OSC clients shared by all OSC senders: one client (i.e. one socket), connected to
+# its destination, per (ip, port) destination. clients are reference counted, and closed when
+# released by the last sender using them
+class OscClientPool():
+
+    # (ip, port) -> [client, reference count]
+    clients = {}
+
+    # get client connected to address (ip, port), create it if need be
+    @classmethod
+    def acquire(cls, address):
+
+        entry = cls.clients.get(address)
+        if entry is None:
+            client = OSC.OSCClient()
+            try:
+                client.connect(address)
+            except Exception:
+                # do not leak client socket on connect failure (e.g. bad ip / port)
+                client.close()
+                raise
+            entry = [client, 0]
+            cls.clients[address] = entry
+
+        entry[1] += 1
+        return entry[0]
+
+    # release client connected to address (ip, port), close it if no longer used
+    @classmethod
+    def release(cls, address):
+
+        entry = cls.clients.get(address)
+        if entry is None: return
+
+        entry[1] -= 1
+        if entry[1] <= 0:
+            entry[0].close()
+            del cls.clients[address]
+
+
+# queue of outgoing OSC messages, filled during a modal tick and flushed at its end. messages
+# are either critical (e.g. source / listener transforms) or bulk (e.g. room geometry): critical
+# messages are all sent on flush, bulk messages are sent after them, within a given size budget
+# per flush, the remainder waiting for the next ones. state messages (e.g. transforms) can be
+# coalesced: only the last value queued for a given address is sent, in place of the first one
+class OscSendQueue():
+
+    def __init__(self):
+
+        # [address, content, coalesce, None] of critical messages, in send order
+        self.msgs = []
+        # address -> index in msgs of coalesced messages
+        self.coalesced = dict()
+        # [address, content, False, estimated size] of bulk messages, in send order
+        self.bulkMsgs = deque()
+        # number of messages replaced by a more recent value since start
+        self.numCoalesced = 0
+
+    # add message to queue, replace previous value queued for address if coalesce
+    def push(self, address, content = None, coalesce = False, bulk = False):
+
+        if( bulk ): self.bulkMsgs.append( [address, content, False, estimateOscSize(address, content)] )
+        else: self.pushCritical( [address, content, coalesce, None] )
+
+    # add critical message [address, content, coalesce, None] to queue
+    def pushCritical(self, msg):
+
+        if( msg[2] ):
+            index = self.coalesced.get(msg[0])
+            if( index is not None ):
+                self.msgs[index][1] = msg[1]
+                self.numCoalesced += 1
+                return
+            self.coalesced[msg[0]] = len(self.msgs)
+
+        self.msgs.append(msg)
+
+    # get queued messages ([address, content, coalesce, size] lists), empty queue: all critical
+    # messages followed by bulk messages up to maxBulkSize bytes (at least one), all bulk
+    # messages if maxBulkSize is None or <= 0
+    def pop(self, maxBulkSize = None):
+
+        msgs = self.msgs
+        self.msgs = []
+        self.coalesced.clear()
+
+        # add bulk messages
+        bulkMsgs = self.bulkMsgs
+        bulkSize = 0
+        while( bulkMsgs ):
+            if( maxBulkSize and maxBulkSize > 0 and bulkSize > 0 and bulkSize + bulkMsgs[0][3] > maxBulkSize ): break
+            msg = bulkMsgs.popleft()
+            msgs.append(msg)
+            bulkSize += msg[3]
+
+        return msgs
+
+    # put popped (yet not sent) messages back at the front of the queue, e.g. when the send
+    # thread queue is full: they are sent on next pop, before newer messages (coalesced ones
+    # are replaced by newer values queued since)
+    def requeue(self, msgs):
+
+        # critical messages: requeued ones first, then those queued since pop
+        newMsgs = self.msgs
+        self.msgs = []
+        self.coalesced.clear()
+        for msg in msgs:
+            if( msg[3] is None ): self.pushCritical(msg)
+        for msg in newMsgs: self.pushCritical(msg)
+
+        # bulk messages
+        self.bulkMsgs.extendleft( reversed([ msg for msg in msgs if msg[3] is not None ]) )
+
+    # discard queued bulk messages of sender whose osc header is header, with address starting
+    # with header + "/" + any of given subaddresses (e.g. drop the rest of an outdated room
+    # definition when a new one begins), return number of discarded messages
+    def discardBulk(self, header, subAddresses):
+
+        prefixes = tuple( header + "/" + subAddress for subAddress in subAddresses )
+        numMsgs = len(self.bulkMsgs)
+        self.bulkMsgs = deque( msg for msg in self.bulkMsgs if not msg[0].startswith(prefixes) )
+        return numMsgs - len(self.bulkMsgs)
+
+    # number of bulk messages waiting to be sent
+    def getNumPendingBulk(self):
+        return len(self.bulkMsgs)
+
+    def __len__(self):
+        return len(self.msgs) + len(self.bulkMsgs)
+
+
+# background thread sending batches of queued OSC messages (see OscSendQueue): the main thread
+# only enqueues batches, message encoding and socket writes happen in the thread. the queue of
+# batches is bounded: batches put while it is full are refused (and counted), for the caller
+# to send them later (see OscSendQueue.requeue). nothing is dropped, except batches whose send
+# failed (logged and counted, the thread keeps running)
+class OscSendThread():
+
+    def __init__(self, sendBatch, maxQueueSize = 256):
+
+        # method called (in thread) on each batch, i.e. list of messages popped from OscSendQueue
+        self.sendBatch = sendBatch
+
+        # init locals
+        self.queue = queue.Queue(maxQueueSize)
+        self.thread = None
+        self.numSent = 0 # messages sent since start
+        self.numRefused = 0 # messages refused since start (queue full), sent later
+        self.numFailed = 0 # messages of batches whose send raised an error since start
+        self.timeout = 2.0 # max wait (in sec) for room in queue / thread end on blocking calls
+
+    # start thread
+    def start(self):
+
+        self.thread = threading.Thread(target=self.sendLoop, daemon=True)
+        self.thread.start()
+
+    # stop thread once all queued batches are sent
+    def stop(self):
+
+        # discard if not started
+        if( self.thread is None ): return
+
+        # blocking put: stop request waits for room in queue (up to timeout)
+        if( self.isAlive() ):
+            try:
+                self.queue.put(None, True, self.timeout)
+                self.thread.join(self.timeout)
+            except queue.Full:
+                pass
+
+        if( self.isAlive() ): print(self.__class__.__name__, 'warning: send thread stop timeout,', self.getQueueDepth(), 'updates not sent')
+        self.thread = None
+
+    # thread is running
+    def isAlive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    # add batch of messages to send queue, return False if refused (queue full). waits for
+    # room in queue (up to timeout) if block
+    def put(self, msgs, block = False):
+
+        try:
+            self.queue.put(msgs, block, self.timeout if block else None)
+            return True
+        except queue.Full:
+            self.numRefused += len(msgs)
+            return False
+
+    # number of batches waiting to be sent
+    def getQueueDepth(self):
+        return self.queue.qsize()
+
+    # thread loop: send batches until stop request (None)
+    def sendLoop(self):
+
+        while True:
+
+            msgs = self.queue.get()
+            if( msgs is None ): break
+
+            # send errors (e.g. argument encoding) must not end the thread: queue would then
+            # never be emptied
+            try:
+                self.sendBatch(msgs)
+                self.numSent += len(msgs)
+            except Exception as e:
+                self.numFailed += len(msgs)
+                print(self.__class__.__name__, 'error: send batch fail (' + str(len(msgs)) + ' messages):', e)
+
+
+# approximate size (in bytes) of OSC message with given address and content (see OSCMessage),
+# used to meter bulk sends without encoding messages
+def estimateOscSize(address, content):
+
+    # no argument
+    if( content is None ): return len(address) + 8
+
+    # pre-encoded message
+    if( isinstance(content, OSC.OSCMessageTemplate) ): return content.size
+
+    # one argument
+    if( not isinstance(content, (list, tuple)) ): content = (content,)
+
+    size = len(address) + len(content) + 8
+    for value in content:
+        if( isinstance(value, str) ): size += len(value) + 4
+        else: size += 4
+
+    return size
+
+
 # any object capable of sending OSC messages
 class AbstractOscSender(AbstractBase):
 
@@ -22,18 +257,49 @@ class AbstractOscSender(AbstractBase):
         # init local
         self.osc = {
         'header': "",
-        'client': OSC.OSCClient(), 
+        'client': None, # shared client, see OscClientPool
         'ip_remote': None,
-        'port_write': None
+        'port_write': None,
+        'queue': None, # shared OscSendQueue, messages are sent directly if None
+        'templates': {}, # (header, typetags) -> OSCMessageTemplate, see getOscTemplate
+        'writer': None, # export writer messages / packets are written to rather than sent (see Evertims.exportSceneAsOscList)
+        'bundle': None, # OSCBundleWriter of messages waiting to be sent as a bundle (see beginBundle)
+        'bundle_first': None # first message of the bundle (sent as is if alone)
         }
 
+        # queue messages as bulk (rather than critical) messages, see OscSendQueue
+        self.isBulkSender = False
+
+        # max size of bundles sent between beginBundle and endBundle calls (in bytes), 0 to
+        # send messages one by one. default size keeps bundles within a typical ethernet MTU
+        self.maxBundleSize = 1400
+
 
     # setup osc parameters
     def initOsc(self, ip, port):
 
+        # release previously used client
+        self.releaseOsc()
+
         self.osc['ip_remote'] = ip
         self.osc['port_write'] = port
 
+        # get shared client, connected to destination once: messages are then written with a
+        # plain send, without per-message select / connect
+        try:
+            self.osc['client'] = OscClientPool.acquire((ip, port))
+        except OSC.OSCClientError as e:
+            print(self.__class__.__name__, 'error: osc sender connect fail:', e)
+
+    # release shared osc client
+    def releaseOsc(self):
+
+        # discard if no client
+        if( self.osc['client'] is None ): return
+
+        OscClientPool.release((self.osc['ip_remote'], self.osc['port_write']))
+        self.osc['client'] = None
+
 
     # get object id (added to osc messages)
     def getIdAsString(self):
@@ -52,8 +318,50 @@ class AbstractOscSender(AbstractBase):
         # shape header with id
         return "/" + self.osc['header'] + "/" + self.getIdAsString ()
 
-    # send osc message
-    def send(self, header, content = None):
+    # send osc message (added to send queue if defined). coalesce: only the last value sent
+    # to this address before queue flush is kept (for state messages, e.g. transforms)
+    def send(self, header, content = None, coalesce = False):
+
+        # prepend local header to msg header
+        address = self.getOscHeader() + "/" + header
+
+        # add message to send queue if defined
+        if( self.osc['queue'] is not None ):
+            self.osc['queue'].push(address, content, coalesce, self.isBulkSender)
+            return
+
+        self.sendToAddress(address, content)
+
+    # get message template (address and typetags encoded once) for messages with given header
+    # and typetags, see sendTemplate. templates are cached: only use for fixed headers (e.g. not
+    # for per-face addresses, one cached template per face)
+    def getOscTemplate(self, header, typetags):
+
+        key = (header, typetags)
+        template = self.osc['templates'].get(key)
+        if( template is None ):
+            template = OSC.OSCMessageTemplate(self.getOscHeader() + "/" + header, typetags)
+            self.osc['templates'][key] = template
+
+        return template
+
+    # send osc message from template (see getOscTemplate): only values are encoded
+    def sendTemplate(self, template, values, coalesce = False):
+
+        # pack values, copy message (template reused for next sends while message is queued)
+        template.setValues(values)
+        msg = template.copy()
+
+        # add message to send queue if defined
+        if( self.osc['queue'] is not None ):
+            self.osc['queue'].push(template.address, msg, coalesce, self.isBulkSender)
+            return
+
+        self.sendToAddress(template.address, msg)
+
+    # send osc message to full address (i.e. osc header already prepended). content may be
+    # a pre-encoded message (see sendTemplate)
+    def sendToAddress(self, address, content = None):
         
         # locals
         ip = self.osc['ip_remote']
@@ -64,21 +372,107 @@ class AbstractOscSender(AbstractBase):
             print(self.__class__.__name__, 'error: undefined osc sender ip and/or port')
             return 
 
-        # prepend local header to msg header
-        header = self.getOscHeader() + "/" + header
-
         # create OSC message
-        msg = OSC.OSCMessage()
-        msg.setAddress(header)
-        if( content != None ): msg.append(content)
+        if( isinstance(content, OSC.OSCMessageTemplate) ):
+            msg = content
+        else:
+            msg = OSC.OSCMessage()
+            msg.setAddress(address)
+            if( content != None ): msg.append(content)
+
+        # add message to current bundle if bundling
+        if( self.osc['bundle'] is not None ):
+            self.appendToBundle(msg)
+            if self.dbg: print ('-> osc bundle for ' + str(port) + '@' + ip + ': ' + address, content)
+            return
 
         # send OSC message
+        if self.sendOscPacket(msg) and self.dbg: print ('-> osc send to ' + str(port) + '@' + ip + ': ' + address, content)
+
+    # send OSC message or bundle, return True on success
+    def sendOscPacket(self, packet):
+
+        # locals
+        ip = self.osc['ip_remote']
+        port = self.osc['port_write']
+
+        # write packet to export file rather than sending it
+        if( self.osc['writer'] is not None ):
+            self.osc['writer'].writePacket( packet.getBinary() )
+            return True
+
+        # sanity check
+        if( self.osc['client'] is None ):
+            print(self.__class__.__name__, 'error: undefined osc sender client')
+            return False
+
+        # send OSC packet (fast path if destination is the one client is connected to)
         try:
-            self.osc['client'].sendto(msg,(ip, port))
-            if self.dbg: print ('-> osc send to ' + str(port) + '@' + ip + ': ' + header, content)
+            self.osc['client'].sendConnected(packet,(ip, port))
+            return True
         except TypeError:
             print ('error: osc message send fail: no route to', str(port) + '@' + ip)
-            return
+            return False
+        except OSC.OSCClientError as e:
+            print ('error: osc message send fail:', e)
+            return False
+
+    # start bundling: messages sent until endBundle is called are packed into bundles of at
+    # most self.maxBundleSize bytes (a message larger than that is sent on its own). bundles
+    # are serialized as messages are added, in a single buffer reused from one bundle to the next
+    def beginBundle(self):
+
+        # discard if bundling disabled
+        if( self.maxBundleSize <= 0 ): return
+
+        self.osc['bundle'] = OSC.OSCBundleWriter()
+        self.osc['bundle_first'] = None
+
+    # add message to current bundle, send bundle first if message would not fit in
+    def appendToBundle(self, msg):
+
+        # locals: pre-encoded message appended as is (its buffer copied once, into the bundle),
+        # other messages encoded once
+        bundle = self.osc['bundle']
+        if( isinstance(msg, OSC.OSCMessageTemplate) ):
+            element = msg
+            size = msg.size
+        else:
+            element = msg.getBinary()
+            size = len(element)
+
+        # send current bundle if message does not fit in (message prepended by its size)
+        if( bundle.count > 0 and bundle.size + size + 4 > self.maxBundleSize ):
+            self.flushBundle()
+
+        if( bundle.count == 0 ): self.osc['bundle_first'] = msg
+        bundle.append(element)
+
+    # send messages of current bundle
+    def flushBundle(self):
+
+        # locals
+        bundle = self.osc['bundle']
+
+        # discard if empty
+        if( bundle.count == 0 ): return
+
+        # send single message as is, or whole bundle
+        if( bundle.count == 1 ): self.sendOscPacket(self.osc['bundle_first'])
+        else: self.sendOscPacket(bundle)
+
+        # reset bundle
+        bundle.clear()
+        self.osc['bundle_first'] = None
+
+    # stop bundling, send remaining messages
+    def endBundle(self):
+
+        # discard if not bundling
+        if( self.osc['bundle'] is None ): return
+
+        self.flushBundle()
+        self.osc['bundle'] = None
 
 
 # any room, source, or listener
@@ -94,6 +488,9 @@ class AbstractObj(AbstractOscSender):
         self.obj = None
 
     def start(self):
+        # drop message templates (object id may have changed since they were created)
+        self.osc['templates'].clear()
+
         # notify client of object spawn
         self.send("spawn")
 
@@ -104,6 +501,9 @@ class AbstractObj(AbstractOscSender):
         # notify client of object destroy
         self.send("destroy")
 
+        # release shared osc client
+        self.releaseOsc()
+
 
 # any source, listener
 class AbstractMovable(AbstractObj):
@@ -128,8 +528,8 @@ class AbstractMovable(AbstractObj):
         world_tranform = self.obj.matrix_world.normalized() # discard source / listener object scaling
         mat = evertUtils.mat4x4ToTuple(world_tranform)
 
-        # send transform message
-        self.send("transform/matrix", mat)
+        # send transform message (from template: only matrix values encoded)
+        self.sendTemplate(self.getOscTemplate("transform/matrix", 'f' * 16), mat, coalesce = True)
         
     # define threshold value to limit movable updates to Evertims client.
     def setMoveThreshold(self, thresholdLoc, thresholdRot):
@@ -1,8 +1,11 @@
 import bpy
 import socket
+import numpy as np
 from . import ( evertUtils )
 from .evertAbstractClasses import *
 import time
+import copy
+import threading
 
 
 # ############################################################
@@ -24,11 +27,34 @@ class EvertRoom(AbstractObj):
         self.osc['header'] = "room"
         self.id = 1
 
+        # room geometry may be large: queue it as bulk messages, spread across modal ticks,
+        # not to delay source / listener transforms
+        self.isBulkSender = True
+
         # throttle (time) udpate mechanism
         self.udpateInterval = 1 # in sec
         self.nextUpdateTime = 0 # in sec
         self.is_udpated_tmp = False
 
+        # incremental update mechanism: on update, only send faces of changed room objects
+        # rather than the whole room (full room definition still sent on start, or if the
+        # number of faces of an object changes)
+        self.incrementalUpdates = True
+        self.faceCache = {} # object name -> EvertFaceCache of faces last sent to client
+        self.updatedObjNames = set() # names of room objects changed since last update
+        self.geometryUpdatedObjNames = set() # subset of the above whose geometry changed (not only transform)
+
+        # hashed index of room objects (object pointer -> object), rebuilt when room collection
+        # changes, used to check depsgraph updates against room objects
+        self.objIndex = {}
+        self.objIndexSize = -1
+
+        # re-extract all room objects on each update, for when no depsgraph update callback is
+        # triggered (e.g. when walking through animation frames, see Evertims.exportAnimationAsOscLog).
+        # catches any change of evaluated geometry (transform, shape keys, armature, modifiers),
+        # only faces that differ from those last sent are sent (see sendRoomUpdate)
+        self.pollGeometry = False
+
 
     # called upon auralization start
     def start(self):
@@ -38,6 +64,10 @@ class EvertRoom(AbstractObj):
 
         # init locals
         self.is_updated = True
+        self.faceCache.clear()
+        self.updatedObjNames.clear()
+        self.geometryUpdatedObjNames.clear()
+        self.buildObjIndex()
 
         # add callback to stack
         bpy.app.handlers.depsgraph_update_post.append(self.check_for_updates_callback)
@@ -46,6 +76,10 @@ class EvertRoom(AbstractObj):
     # called upon auralization stop
     def stop(self):
 
+        # drop queued (not yet sent) remainder of room definition / update: not to be sent after
+        # client dsp is stopped and before room destroy
+        if( self.osc['queue'] is not None ): self.osc['queue'].discardBulk(self.getOscHeader(), ("define", "face"))
+
         # parent method
         super().stop()
 
@@ -56,6 +90,9 @@ class EvertRoom(AbstractObj):
     # running callback
     def update(self):
 
+        # flag all room objects as updated
+        if( self.pollGeometry ): self.flagAllObjectsUpdated()
+
         # discard if no update required
         if not self.is_updated:
             return
@@ -69,10 +106,13 @@ class EvertRoom(AbstractObj):
         self.nextUpdateTime = currentTime + self.udpateInterval
 
         # send update
-        self.sendRoom()
+        if( self.incrementalUpdates and len(self.faceCache) > 0 ): self.sendRoomUpdate(self.updatedObjNames, self.geometryUpdatedObjNames)
+        else: self.sendRoom()
 
         # unflag update required
         self.is_updated = False
+        self.updatedObjNames.clear()
+        self.geometryUpdatedObjNames.clear()
 
 
     # local callback called from depsgraph_update_post stack to get immediate access to room objects
@@ -80,26 +120,68 @@ class EvertRoom(AbstractObj):
     # method otherwise)
     def check_for_updates_callback(self, scene, depsgraph):
 
-        # no need for further check if update already planned (material changed)
-        if( self.is_updated ):
-            return
+        # loop over updated room objects
+        for (obj, update) in self.getUpdatedObjects(depsgraph):
+
+            self.updatedObjNames.add(obj.name)
+            self.is_updated = True
+
+            # anything but a transform-only update (e.g. material slot change) requires
+            # faces re-extraction
+            if update.is_updated_geometry or not update.is_updated_transform:
+                self.geometryUpdatedObjNames.add(obj.name)
 
-        # @todo: optimize
-        for update in depsgraph.updates:
-            for obj in self.objList:
-                # if update.id.original == active_obj and update.is_updated_geometry or update.is_updated_transform:
-                if update.id.original == obj:
-                    self.is_updated = True
+
+    # flag all room objects as updated, geometry included (faces re-extracted on next update)
+    def flagAllObjectsUpdated(self):
+
+        objNames = set( obj.name for obj in self.objList )
+        self.updatedObjNames |= objNames
+        self.geometryUpdatedObjNames |= objNames
+        self.is_updated = True
+
+
+    # (re)build hashed index of room objects
+    def buildObjIndex(self):
+
+        self.objIndex = { obj.as_pointer(): obj for obj in self.objList }
+        self.objIndexSize = len(self.objList)
+
+
+    # return list of (room object, depsgraph update) for all room objects updated in depsgraph
+    def getUpdatedObjects(self, depsgraph):
+
+        # init locals
+        updates = depsgraph.updates
+        updatedObjects = []
+
+        # rebuild index if room collection (may have) changed. a change in collection also
+        # requires a room update (sendRoomUpdate checks for added / removed objects)
+        if( len(self.objList) != self.objIndexSize or any( isinstance(update.id, bpy.types.Collection) for update in updates ) ):
+            self.buildObjIndex()
+            self.is_updated = True
+
+        # look updated ids up in index
+        for update in updates:
+            obj = self.objIndex.get( update.id.original.as_pointer() )
+            if obj is not None: updatedObjects.append( (obj, update) )
+
+        return updatedObjects
 
 
     # send room geometry to client
     def sendRoom(self):
 
+        # drop queued (not yet sent) remainder of previous room definitions / updates, outdated
+        if( self.osc['queue'] is not None ): self.osc['queue'].discardBulk(self.getOscHeader(), ("define", "face"))
+
         # warn client that room definition is about to start
         self.send("definestart")
 
         # init loop
         faceId = 1
+        self.faceCache.clear()
+        depsgraph = bpy.context.evaluated_depsgraph_get()
 
         # loop over room objects
         for obj in self.objList:
@@ -108,20 +190,22 @@ class EvertRoom(AbstractObj):
             if obj.type != 'MESH':
                 continue
 
-            # get list of faces vertices with associated materials
-            (facesMatList, facesVertList) = evertUtils.getFacesMatVertList(obj)
+            # get faces vertices (local space) with associated materials, move them to world space
+            (facesMat, localFacesVerts) = evertUtils.getLocalFacesMatNameVertArrays(obj, depsgraph)
+            facesVerts = evertUtils.transformFacesArray(localFacesVerts, obj.matrix_world)
 
-            # loop over faces
-            for iFace in range( len( facesMatList ) ):
+            # save faces (and the range of face ids they use) to local cache
+            self.faceCache[obj.name] = EvertFaceCache(faceId, facesMat, facesVerts, localFacesVerts)
 
-                # send face id
-                self.send("face", faceId)
+            # convert to lists in bulk before looping over faces
+            facesMatList = facesMat.tolist()
+            facesVertList = facesVerts.tolist()
 
-                # send face material
-                self.send("face/"+str(faceId)+"/material", facesMatList[iFace])
+            # loop over faces
+            for iFace in range( len( facesMatList ) ):
 
-                # send face triangles
-                self.send("face/"+str(faceId)+"/triangles/xyz", facesVertList[iFace])
+                # send face
+                self.sendFace(faceId, facesMatList[iFace], facesVertList[iFace])
 
                 # increment face id
                 faceId += 1
@@ -130,6 +214,93 @@ class EvertRoom(AbstractObj):
         self.send("defineover")
 
 
+    # send faces of room objects that changed since last room definition. faces of objects in
+    # objNames but not in geometryObjNames (transform-only update) are not re-extracted, cached
+    # local space faces are moved to the new object world transform
+    def sendRoomUpdate(self, objNames, geometryObjNames):
+
+        # full definition required if list of room meshes changed
+        meshNames = set( obj.name for obj in self.objList if obj.type == 'MESH' )
+        if( meshNames != set(self.faceCache) ):
+            self.sendRoom()
+            return
+
+        # init locals
+        changedFaces = []
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+
+        # loop over changed room objects
+        for obj in self.objList:
+
+            # discard if object not changed or not a mesh
+            if obj.name not in objNames or obj.type != 'MESH':
+                continue
+
+            # get local space faces vertices with associated materials (from cache if only
+            # object transform changed)
+            cache = self.faceCache[obj.name]
+            if( obj.name in geometryObjNames ):
+                (facesMat, localFacesVerts) = evertUtils.getLocalFacesMatNameVertArrays(obj, depsgraph)
+            else:
+                (facesMat, localFacesVerts) = (cache.materials, cache.localVertices)
+
+            # full definition required if number of faces changed (face ids would shift)
+            if( len(facesMat) != len(cache.materials) ):
+                self.sendRoom()
+                return
+
+            # move faces to world space
+            facesVerts = evertUtils.transformFacesArray(localFacesVerts, obj.matrix_world)
+
+            # list faces that differ from those last sent
+            isChanged = (facesMat != cache.materials) | np.any(facesVerts != cache.vertices, axis=1)
+            for iFace in np.flatnonzero(isChanged).tolist():
+                changedFaces.append( (cache.firstFaceId + iFace, facesMat[iFace].item(), facesVerts[iFace].tolist()) )
+
+            # update cache
+            cache.materials = facesMat
+            cache.vertices = facesVerts
+            cache.localVertices = localFacesVerts
+
+        # discard if no face changed
+        if( len(changedFaces) == 0 ):
+            return
+
+        # send changed faces only
+        self.send("definestart")
+        for (faceId, faceMat, faceVerts) in changedFaces: self.sendFace(faceId, faceMat, faceVerts)
+        self.send("defineover")
+
+        # debug
+        if self.dbg: print(self.__class__.__name__, 'sent', len(changedFaces), 'updated faces')
+
+
+    # send face definition to client
+    def sendFace(self, faceId, faceMat, faceVerts):
+
+        # send face id
+        self.sendTemplate(self.getOscTemplate("face", 'i'), (faceId,))
+
+        # send face material
+        self.send("face/"+str(faceId)+"/material", faceMat)
+
+        # send face triangles (plain send: address differs per face, no template)
+        self.send("face/"+str(faceId)+"/triangles/xyz", faceVerts)
+
+
+# used by room: faces of a room object last sent to client (array of material names, Nx9 array
+# of vertices in world and in object local space), with their range of face ids
+class EvertFaceCache():
+
+    def __init__(self, firstFaceId, materials, vertices, localVertices):
+
+        # init locals
+        self.firstFaceId = firstFaceId
+        self.materials = materials
+        self.vertices = vertices
+        self.localVertices = localVertices
+
+
 class EvertSourceListener(AbstractMovable):
 
     def __init__(self, obj, typeOfInstance):
@@ -144,7 +315,9 @@ class EvertSourceListener(AbstractMovable):
 
 
 # used by ray manager. solutions are sent by Evertims client to ray drawer. a unique solution
-# is created for each combination of source/listener/room in the scene
+# is created for each combination of source/listener/room in the scene. path geometry is held
+# in contiguous float32 arrays: a point buffer shared by all paths, and per-path columns (order,
+# length, reflectance, range in point buffer) indexed by path row (see self.pathRows)
 class EvertSolution():
 
     def __init__(self):
@@ -153,32 +326,215 @@ class EvertSolution():
         self.roomName = ""
         self.sourceName = ""
         self.listenerName = ""
-        self.paths = {}
 
-    # print solution to console
-    def print(self, indent = ""):
-        print(indent, "room", self.roomName)
-        print(indent, "source", self.sourceName)
-        print(indent, "listener", self.listenerName)
-        print(indent, "number of paths", len(self.paths))
+        # path id -> path row, and list of rows freed by deleted paths
+        self.pathRows = {}
+        self.freeRows = []
+
+        # path columns
+        self.pathOrder = np.full(0, -1, dtype=np.int32)
+        self.pathLength = np.full(0, -1, dtype=np.float32)
+        self.pathStart = np.zeros(0, dtype=np.int32) # first point of path in point buffer
+        self.pathCount = np.zeros(0, dtype=np.int32) # number of points of path
+        self.pathReflectance = np.zeros((0, 0), dtype=np.float32)
+
+        # point buffer, and path row of each point (-1 for unused points)
+        self.points = np.zeros((0, 3), dtype=np.float32)
+        self.pointRows = np.full(0, -1, dtype=np.int32)
+        self.numPoints = 0 # used part of point buffer (unused points included)
+        self.numUnusedPoints = 0
+
+    # number of paths in solution
+    def getNumPaths(self):
+        return len(self.pathRows)
+
+    # get path row, create it if need be
+    def getPathRow(self, pathId):
+
+        # existing path
+        row = self.pathRows.get(pathId)
+        if row is not None: return row
+
+        # reuse row of a deleted path, extend columns otherwise
+        if len(self.freeRows) > 0:
+            row = self.freeRows.pop()
+        else:
+            row = len(self.pathRows)
+            if row >= len(self.pathOrder): self.growPathColumns(max(64, 2 * len(self.pathOrder)))
+
+        # init row
+        self.pathOrder[row] = -1
+        self.pathLength[row] = -1
+        self.pathStart[row] = 0
+        self.pathCount[row] = 0
+        self.pathReflectance[row] = 0
+        self.pathRows[pathId] = row
+
+        return row
+
+    # resize path columns
+    def growPathColumns(self, size):
+
+        grow = size - len(self.pathOrder)
+        self.pathOrder = np.concatenate((self.pathOrder, np.full(grow, -1, dtype=np.int32)))
+        self.pathLength = np.concatenate((self.pathLength, np.full(grow, -1, dtype=np.float32)))
+        self.pathStart = np.concatenate((self.pathStart, np.zeros(grow, dtype=np.int32)))
+        self.pathCount = np.concatenate((self.pathCount, np.zeros(grow, dtype=np.int32)))
+        self.pathReflectance = np.concatenate((self.pathReflectance, np.zeros((grow, self.pathReflectance.shape[1]), dtype=np.float32)))
+
+    # set path length
+    def setPathLength(self, pathId, length):
+
+        # get row first: adding a path may grow (i.e. replace) column arrays
+        row = self.getPathRow(pathId)
+        self.pathLength[row] = length
+
+    # set path reflectance (one value per frequency band)
+    def setPathReflectance(self, pathId, values):
 
-# used by ray manager, a path is a collection of points that represent an acoustic path
-class EvertPath():
+        # init locals
+        row = self.getPathRow(pathId)
+        numBands = len(values)
 
-    def __init__(self):
+        # resize reflectance column if need be
+        if numBands > self.pathReflectance.shape[1]:
+            grow = np.zeros((self.pathReflectance.shape[0], numBands - self.pathReflectance.shape[1]), dtype=np.float32)
+            self.pathReflectance = np.concatenate((self.pathReflectance, grow), axis=1)
+
+        self.pathReflectance[row] = 0
+        self.pathReflectance[row, :numBands] = values
+
+    # set path points from a flat (x1, y1, z1, x2, ...) sequence
+    def setPathPoints(self, pathId, xyz):
 
         # init locals
-        self.order = -1
-        self.length = -1
-        self.points = None
-        self.reflectance = None
+        row = self.getPathRow(pathId)
+        xyz = np.asarray(xyz, dtype=np.float32).reshape(-1, 3)
+        count = len(xyz)
+        self.pathOrder[row] = count - 2
+
+        # same number of points: overwrite in place
+        if count == self.pathCount[row]:
+            start = self.pathStart[row]
+            self.points[start:start + count] = xyz
+            return
+
+        # release old points, append new ones at the end of point buffer
+        self.releasePathPoints(row)
+        start = self.allocatePoints(count)
+        self.points[start:start + count] = xyz
+        self.pointRows[start:start + count] = row
+        self.pathStart[row] = start
+        self.pathCount[row] = count
+
+    # mark path points as unused
+    def releasePathPoints(self, row):
+
+        start = self.pathStart[row]
+        count = self.pathCount[row]
+        self.pointRows[start:start + count] = -1
+        self.numUnusedPoints += count
+        self.pathCount[row] = 0
+
+    # reserve count points at the end of point buffer, return index of first point
+    def allocatePoints(self, count):
+
+        # compact point buffer if mostly unused
+        if self.numUnusedPoints > 1024 and self.numUnusedPoints > self.numPoints // 2:
+            self.compactPoints()
+
+        # grow point buffer if need be
+        size = len(self.points)
+        if self.numPoints + count > size:
+            grow = max(self.numPoints + count, 2 * size, 256) - size
+            self.points = np.concatenate((self.points, np.zeros((grow, 3), dtype=np.float32)))
+            self.pointRows = np.concatenate((self.pointRows, np.full(grow, -1, dtype=np.int32)))
+
+        start = self.numPoints
+        self.numPoints += count
+        return start
+
+    # remove unused points from point buffer (preserves order of used points)
+    def compactPoints(self):
+
+        # index of used points
+        rows = self.pointRows[:self.numPoints]
+        isUsed = rows >= 0
+        used = np.flatnonzero(isUsed)
+
+        # shift path starts by number of unused points before them
+        unusedBefore = np.cumsum(~isUsed) - (~isUsed)
+        pathRows = np.flatnonzero(self.pathCount[:len(self.pathRows) + len(self.freeRows)] > 0)
+        self.pathStart[pathRows] -= unusedBefore[self.pathStart[pathRows]].astype(np.int32)
+
+        # move points
+        numUsed = len(used)
+        self.points[:numUsed] = self.points[used]
+        self.pointRows[:numUsed] = rows[used]
+        self.pointRows[numUsed:self.numPoints] = -1
+        self.numPoints = numUsed
+        self.numUnusedPoints = 0
+
+    # delete paths from solution
+    def deletePaths(self, pathIds):
+
+        for pathId in pathIds:
+
+            # discard unknown path
+            row = self.pathRows.pop(pathId, None)
+            if row is None: continue
+
+            # release path row
+            self.releasePathPoints(row)
+            self.pathOrder[row] = -1
+            self.freeRows.append(row)
+
+    # get segments of all paths with order below orderMax, as (2 x numSegments, 3) array of
+    # points (2 consecutive points per segment)
+    def getSegments(self, orderMax):
+
+        # segment i links point i to point i+1 if both belong to the same (visible) path
+        rows = self.pointRows[:self.numPoints]
+        if len(rows) < 2: return np.zeros((0, 3), dtype=np.float32)
+        isSegment = (rows[:-1] == rows[1:]) & (rows[:-1] >= 0)
+        isSegment &= self.pathOrder[np.maximum(rows[:-1], 0)] <= orderMax
+        first = np.flatnonzero(isSegment)
+
+        # interleave segment start / end points
+        coords = np.empty((2 * len(first), 3), dtype=np.float32)
+        coords[0::2] = self.points[first]
+        coords[1::2] = self.points[first + 1]
+        return coords
+
+    # get path points of all paths with order below orderMax, as list of (numPoints, 3) arrays
+    def getPathsPoints(self, orderMax):
 
-    # print path to console
+        pathsPoints = []
+        for row in self.pathRows.values():
+            count = self.pathCount[row]
+            if count == 0 or self.pathOrder[row] > orderMax: continue
+            start = self.pathStart[row]
+            pathsPoints.append(self.points[start:start + count])
+
+        return pathsPoints
+
+    # return a copy of the solution, sharing nothing with the original
+    def copy(self):
+
+        solution = copy.copy(self)
+        solution.pathRows = self.pathRows.copy()
+        solution.freeRows = self.freeRows.copy()
+        for attr in ('pathOrder', 'pathLength', 'pathStart', 'pathCount', 'pathReflectance', 'points', 'pointRows'):
+            setattr(solution, attr, getattr(self, attr).copy())
+        return solution
+
+    # print solution to console
     def print(self, indent = ""):
-        print(indent, "order", self.order)
-        print(indent, "length", self.length)
-        if( self.points ): print(indent, "points", self.points)
-        if( self.reflectance ): print(indent, "reflectance", self.reflectance)
+        print(indent, "room", self.roomName)
+        print(indent, "source", self.sourceName)
+        print(indent, "listener", self.listenerName)
+        print(indent, "number of paths", self.getNumPaths())
+        print(indent, "number of points", self.numPoints - self.numUnusedPoints)
 
 
 # receive messages from Evertims client, shape them into rays, drawn in 3D scene for debug
@@ -197,6 +553,36 @@ class RayManager():
         self.solutions = {}
         self.drawOrderMax = 2
 
+        # max time (in sec) spent handling incoming packets per update, 0 to handle a single
+        # packet per update
+        self.receiveTimeBudget = 0.02
+
+        # receive statistics of the last update (packets handled, packets still queued)
+        self.numHandled = 0
+        self.numPending = 0
+
+        # receive packets in a background thread rather than in update()
+        self.useReceiveThread = False
+        self.receiveThread = None
+        self.isReceiving = False
+        self.snapshotInterval = 0.03 # max time (in sec) between two snapshots published by receive thread
+
+        # double buffer: incoming packets are applied to self.solutions (back buffer), drawn
+        # solutions are read from self.frontSolutions. In threaded mode, the receive thread
+        # publishes snapshots of the back buffer that the draw callback swaps in.
+        self.frontSolutions = self.solutions
+        self.pendingSolutions = None
+        self.isBackBufferUpdated = False
+        self.bufferLock = threading.Lock()
+
+        # solutions version, incremented on each change (back buffer), and version of the
+        # solutions currently drawn (front buffer)
+        self.solutionsVersion = 0
+        self.frontVersion = 0
+
+        # ray drawer: single gpu batch for all visible segments, rebuilt on solutions change
+        self.rayBatch = evertUtils.LineBatch((0.8, 0.8, 0.9, 0.7))
+
         # define bpy handle
         self.draw_handler_handle = None
 
@@ -206,10 +592,38 @@ class RayManager():
 
         # init osc server (receive messages, feed them to oscCallback)
         self.oscServer = OSC.OSCServer(self.serverAddress, max_packet_size=self.maxPacketSize)
-        # self.oscServer = OSC.ThreadingOSCServer(self.serverAddress)
 
-        # define osc server default callback
+        # receive homogeneous message arguments (e.g. path points) as numpy arrays
+        self.oscServer.decode_arrays = True
+
+        # queue bundles timetagged in the future, dispatched once due on later updates (rather
+        # than blocking until due)
+        self.oscServer.schedule_bundles = True
+
+        # define osc server callbacks, one per message kind (parsed address segments passed to
+        # callbacks), default callback for unexpected messages
         self.oscServer.addMsgHandler('default', self.oscCallback)
+        self.oscServer.addSegmentHandler('/solution/*/path/deleted', self.oscPathDeletedCallback)
+        self.oscServer.addSegmentHandler('/solution/*/path/*/length', self.oscPathLengthCallback)
+        self.oscServer.addSegmentHandler('/solution/*/path/*/xyz', self.oscPathPointsCallback)
+        self.oscServer.addSegmentHandler('/solution/*/path/*/reflectance', self.oscPathReflectanceCallback)
+        for address in ['created', 'number', 'updated', '*/image', '*/delay']:
+            self.oscServer.addSegmentHandler('/solution/*/path/' + address, self.oscIgnoreCallback)
+
+        # init buffers. in threaded mode, front buffer starts empty (rather than shared with the
+        # back buffer) so that draw callback never reads solutions modified by receive thread
+        self.frontSolutions = {} if self.useReceiveThread else self.solutions
+        self.frontVersion = 0
+        self.pendingSolutions = None
+        self.rayBatch.clear()
+
+        # start receive thread. a single thread serves the socket (rather than the thread per
+        # request of OSC.ThreadingOSCServer) so that path updates are applied in order
+        if( self.useReceiveThread ):
+            self.isReceiving = True
+            self.receiveThread = threading.Thread(target=self.receiveLoop, daemon=True)
+            self.receiveThread.start()
+            if self.dbg: print(self.__class__.__name__, 'started receive thread')
 
         # add local pre_draw method to to scene callback
         # (have to do it that way, rays won't be drawn if drawRays called in stadard update method)
@@ -220,6 +634,13 @@ class RayManager():
     # called upon auralization stop
     def stop(self):
 
+        # stop receive thread
+        if self.receiveThread is not None:
+            self.isReceiving = False
+            self.receiveThread.join()
+            self.receiveThread = None
+            if self.dbg: print(self.__class__.__name__, 'stopped receive thread')
+
         # close listening server
         self.oscServer.close()
 
@@ -230,7 +651,7 @@ class RayManager():
             if self.dbg: print(self.__class__.__name__, 'removed evertims module raytracing callback from draw_handler')
 
 
-    # callback invoked by osc server upon message received
+    # osc callback: messages not handled by any of the callbacks below
     def oscCallback(self, addr, tags, data, client_address):
 
         # print('---------------------------------------------------')
@@ -240,126 +661,157 @@ class RayManager():
         # print('client address ', client_address)
         # print('---------------------------------------------------')
 
-        # for solutionId, solution in self.solutions.items():
-        #     print('solution', solutionId)
-        #     solution.print('   ')
-        #     for pathId, path in solution.paths.items():
-        #         print('path', pathId)
-        #         path.print('      ')
-
         # debug
         if self.dbg: print(self.__class__.__name__, '<- received from', client_address, addr, data)
 
-        # discard unexpected msg
-        if( not addr.startswith("/solution") ):
-            self.unexpectedMsgAddressWarning(addr)
-            return
+        # unexpected message address warning
+        self.unexpectedMsgAddressWarning(addr)
 
-        # split msg address
-        addrArray = addr.split('/')
-        solutionId = addrArray[2]
-        arg1 = addrArray[3]
-        arg2 = addrArray[4]
+    # osc callback: messages known yet non-processed
+    def oscIgnoreCallback(self, addr, tags, data, client_address, segments):
 
-        # only handling path msg atm
-        if( arg1 != 'path'):
-            self.unexpectedMsgAddressWarning(addr)
-            return
+        # debug
+        if self.dbg: print(self.__class__.__name__, '<- received from', client_address, addr, data)
 
-        # msg: discarded messages
-        if( arg2 == "created" or arg2 == "number" or arg2 == "updated" ):
-            return
+    # get solution segments[0] (created if need be), flag back buffer update
+    def getUpdatedSolution(self, segments):
+
+        # flag back buffer update
+        self.isBackBufferUpdated = True
+        self.solutionsVersion += 1
 
         # create solution if need be
+        solutionId = segments[0]
         if( not solutionId in self.solutions ):
             self.solutions[solutionId] = EvertSolution()
-        solution = self.solutions[solutionId]
+        return self.solutions[solutionId]
 
-        # msg: delete path
-        if( arg2 == "deleted" ):
+    # osc callback: /solution/<solutionId>/path/deleted
+    def oscPathDeletedCallback(self, addr, tags, data, client_address, segments):
 
-            # get list of pathId to delete from solution.paths dict
-            pathIds = [pathId for pathId in solution.paths if pathId in data]
-            for pathId in pathIds: del solution.paths[pathId]
-
-            return
-
-        # shape data
-        pathId = arg2
-        pathAttr = addrArray[5]
-
-        # create path if need be
-        if( not pathId in solution.paths ):
-            solution.paths[pathId] = EvertPath()
+        # debug
+        if self.dbg: print(self.__class__.__name__, '<- received from', client_address, addr, data)
 
-        # msg: path length
-        if( pathAttr == "length" ):
-            solution.paths[pathId].length = data[0]
+        solution = self.getUpdatedSolution(segments)
+        solution.deletePaths([str(pathId) for pathId in data])
 
+    # osc callback: /solution/<solutionId>/path/<pathId>/length
+    def oscPathLengthCallback(self, addr, tags, data, client_address, segments):
 
-        # msg: path xyz points
-        elif( pathAttr == "xyz" ):
+        # debug
+        if self.dbg: print(self.__class__.__name__, '<- received from', client_address, addr, data)
 
-            # sanity check size
-            if( len(data) % 3 != 0 ):
-                print ("wrong format of path point coordinates (not a mult. of 3).", len(data), " float received. path update ignored")
-                return
+        solution = self.getUpdatedSolution(segments)
+        solution.setPathLength(segments[1], data[0])
 
-            # extract data
-            numPoints = int( len(data) / 3 )
-            solution.paths[pathId].order = numPoints - 2
-            solution.paths[pathId].points = []
+    # osc callback: /solution/<solutionId>/path/<pathId>/xyz
+    def oscPathPointsCallback(self, addr, tags, data, client_address, segments):
 
-            # create solution path points
-            for iPoint in range(numPoints):
-                solution.paths[pathId].points.append( ( data[iPoint * 3 + 0], data[iPoint * 3 + 1], data[iPoint * 3 + 2] ) )
+        # debug
+        if self.dbg: print(self.__class__.__name__, '<- received from', client_address, addr, data)
 
-        # # path order
-        # elif (pathAttr == "order"):
-        #     solution.paths[pathId].order = data[0]
-        #     print('path order', data)
+        # sanity check size
+        if( len(data) % 3 != 0 ):
+            print ("wrong format of path point coordinates (not a mult. of 3).", len(data), " float received. path update ignored")
+            return
 
-        # msg: path reflectance
-        elif( pathAttr == "reflectance" ):
-            solution.paths[pathId].reflectance = data
+        # save path points (path order derived from number of points)
+        solution = self.getUpdatedSolution(segments)
+        solution.setPathPoints(segments[1], data)
 
-        # msg: known yet non-processed
-        elif( pathAttr == "image" or pathAttr == "delay" ): return
+    # osc callback: /solution/<solutionId>/path/<pathId>/reflectance
+    def oscPathReflectanceCallback(self, addr, tags, data, client_address, segments):
 
-        # unexpected message address warning
-        else: self.unexpectedMsgAddressWarning( addr );
+        # debug
+        if self.dbg: print(self.__class__.__name__, '<- received from', client_address, addr, data)
 
+        solution = self.getUpdatedSolution(segments)
+        solution.setPathReflectance(segments[1], data)
 
     # draw rays callback, added to Bender stack of draw methods
     def drawRays(self, operator, context):
 
-        # loop over solutions
-        for solutionId, solution in self.solutions.items():
+        # swap in latest solutions published by receive thread
+        self.swapBuffers()
+
+        # rebuild batch if solutions or draw order changed since last draw
+        if( self.receiveThread is None ): self.frontVersion = self.solutionsVersion
+        key = (self.frontVersion, self.drawOrderMax)
+        if( not self.rayBatch.isUpToDate(key) ):
+            self.rayBatch.build(self.getVisibleSegmentsCoords(), key)
 
-            # loop over paths
-            for pathId, path in solution.paths.items():
+        # draw all segments at once
+        self.rayBatch.draw()
 
-                # discard draw if path order above limit
-                if( path.order > self.drawOrderMax ):
-                    continue
 
-                # loop over points (segments)
-                for iPoint in range(len(path.points)-1):
+    # get list of points of all visible segments, 2 consecutive points per segment
+    def getVisibleSegmentsCoords(self):
 
-                    p1 = path.points[iPoint]
-                    p2 = path.points[iPoint+1]
+        # get segments of all solutions
+        coords = [solution.getSegments(self.drawOrderMax) for solution in self.frontSolutions.values()]
 
-                    evertUtils.draw_line_3d((0.8, 0.8, 0.9, 0.7), p1, p2)
+        # discard if empty
+        if( len(coords) == 0 ): return []
+
+        return np.concatenate(coords)
 
 
     # debug: print unexpected osc msg to console
     def unexpectedMsgAddressWarning(self, addr):
-        print("received osc message not handled: " + msg.addr)
+        print("received osc message not handled: " + addr)
+
+
+    # receive thread: apply incoming packets to back buffer, publish snapshots for drawRays
+    def receiveLoop(self):
+
+        while self.isReceiving:
+
+            # handle incoming packets (wait timeout allows to check for stop request)
+            (self.numHandled, self.numPending) = self.oscServer.handle_pending_requests(self.snapshotInterval, wait=0.05)
+
+            # discard if nothing to publish
+            if not self.isBackBufferUpdated:
+                continue
+            self.isBackBufferUpdated = False
+
+            # publish snapshot of back buffer (built outside the lock)
+            version = self.solutionsVersion
+            snapshot = { solutionId: solution.copy() for solutionId, solution in self.solutions.items() }
+            with self.bufferLock:
+                self.pendingSolutions = (snapshot, version)
+
+
+    # swap in latest snapshot published by receive thread, if any
+    def swapBuffers(self):
+
+        # discard if not threaded, back and front buffers are the same
+        if self.receiveThread is None:
+            return
+
+        with self.bufferLock:
+            if self.pendingSolutions is not None:
+                (self.frontSolutions, self.frontVersion) = self.pendingSolutions
+                self.pendingSolutions = None
 
 
     # running callback
     def update(self):
-        self.oscServer.handle_request()
+
+        # threaded mode: packets handled by receive thread
+        if( self.receiveThread is not None ):
+            return
+
+        # legacy mode: handle at most one packet per update
+        if( self.receiveTimeBudget <= 0 ):
+            self.oscServer.dispatch_due_bundles()
+            self.oscServer.handle_request()
+            return
+
+        # handle all pending packets within time budget
+        (self.numHandled, self.numPending) = self.oscServer.handle_pending_requests(self.receiveTimeBudget)
+
+        # debug
+        if self.dbg and self.numPending > 0: print(self.__class__.__name__, 'handled', self.numHandled, 'packets,', self.numPending, 'still queued')
 
 
     # Convert existing rays into curves that will remain in the blender scene after auralization stops
@@ -401,31 +853,17 @@ class RayManager():
         bpy.context.collection.objects.link(curveOB)
 
 
-    # count total number of segment if current solutions
+    # get list of points of all visible paths
     def getListOfVisibleSegments(self):
 
         # init locals
         pathsPoints = []
 
         # loop over solutions
-        for solutionId, solution in self.solutions.items():
-
-            # loop over paths
-            for pathId, path in solution.paths.items():
-
-                # discard draw if path order above draw limit
-                if( path.order > self.drawOrderMax ): continue
-
-                # init list of points
-                pathPoints = []
-
-                # loop over points in path
-                for p in path.points:
-
-                    # extract segment points coordinates
-                    pathPoints.append( [round(p[0],2),round(p[1],2),round(p[2],2)] )
+        for solutionId, solution in self.frontSolutions.items():
 
-                # save segments back to local
-                pathsPoints.append(pathPoints)
+            # extract paths points coordinates
+            for pathPoints in solution.getPathsPoints(self.drawOrderMax):
+                pathsPoints.append( np.round(pathPoints, 2).tolist() )
 
         return pathsPoints
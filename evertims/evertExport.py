@@ -0,0 +1,74 @@
+from itertools import repeat
+from . import OSC
+from .evertReplay import ( LOG_MAGIC, LOG_VERSION, LOG_FLAG_TIMESTAMPS, LOG_HEADER, LOG_RECORD, LOG_SIZE, openLogFile )
+
+# ############################################################
+# Export writers: write OSC messages sent during auralization to disk
+# ############################################################
+
+# write messages to text file, one "address arg1 arg2 ..." line per message. file is opened once
+# for the whole export, writes are buffered
+class OscTextWriter():
+
+    def __init__(self, filePath):
+
+        self.file = open(filePath, 'w', buffering = 1 << 20)
+
+    # write message to file
+    def write(self, address, content = None):
+
+        # shape message
+        if( content is None ):
+            line = address
+
+        # shape content in case of tuple or list, round values to avoid outputs like 1e-6
+        elif( isinstance(content, (list, tuple)) ):
+            line = address + '  ' + ' '.join( map(str, map(round, content, repeat(4))) )
+
+        # default shape content
+        else:
+            line = address + ' ' + str(content)
+
+        self.file.write(line + '\n')
+
+    # flush buffer, close file
+    def close(self):
+
+        self.file.close()
+
+
+# write OSC packets (messages or bundles) to binary packet log file, each preceded by its size
+# and optionally by a timestamp. file is compressed if its extension is .gz or .xz. see
+# evertReplay for file layout and replay
+class OscPacketLogWriter():
+
+    def __init__(self, filePath, timestamps = True):
+
+        self.file = openLogFile(filePath, 'wb')
+        self.timestamps = timestamps
+
+        # timestamp (in sec) of packets written from now on, set by caller (e.g. frame time)
+        self.time = 0.0
+
+        # write file header
+        flags = LOG_FLAG_TIMESTAMPS if timestamps else 0
+        self.file.write( LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, flags) )
+
+    # write message to file
+    def write(self, address, content = None):
+
+        msg = OSC.OSCMessage(address)
+        if( content is not None ): msg.append(content)
+        self.writePacket( msg.getBinary() )
+
+    # write binary OSC packet to file
+    def writePacket(self, data):
+
+        if( self.timestamps ): self.file.write( LOG_RECORD.pack(self.time, len(data)) )
+        else: self.file.write( LOG_SIZE.pack(len(data)) )
+        self.file.write(data)
+
+    # flush buffer, close file
+    def close(self):
+
+        self.file.close()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+import argparse
+import gzip
+import lzma
+import socket
+import struct
+import time
+
+# ############################################################
+# OSC packet log: format and replayer
+#
+# Packet logs are written by Evertims export (see evertExport.OscPacketLogWriter) and hold
+# the exact OSC packets (messages or bundles) sent to the client. This module only depends on
+# the standard library, to replay logs without Blender:
+#
+#   python evertReplay.py scene.osclog 127.0.0.1 3860 --speed 2
+#
+# Logs can be compressed (gzip or lzma, chosen from file extension, see LOG_EXTENSIONS).
+#
+# File layout (big endian):
+#   header: magic (8 bytes) | version (uint16) | flags (uint16)
+#   record: [timestamp in sec (float64), if LOG_FLAG_TIMESTAMPS] | size (uint32) | packet
+# ############################################################
+
+LOG_MAGIC = b'EVERTOSC'
+LOG_VERSION = 1
+LOG_FLAG_TIMESTAMPS = 1
+LOG_HEADER = struct.Struct('>8sHH')
+LOG_RECORD = struct.Struct('>dI') # with timestamp
+LOG_SIZE = struct.Struct('>I') # without timestamp
+LOG_EXTENSIONS = ('.osclog', '.osclog.gz', '.osclog.xz')
+
+
+# read packet log header from file object, return flags
+def readLogHeader(f):
+
+    data = f.read(LOG_HEADER.size)
+    if( len(data) < LOG_HEADER.size ): raise ValueError('not an OSC packet log (truncated header)')
+
+    (magic, version, flags) = LOG_HEADER.unpack(data)
+    if( magic != LOG_MAGIC ): raise ValueError('not an OSC packet log (bad magic)')
+    if( version > LOG_VERSION ): raise ValueError('unsupported OSC packet log version: ' + str(version))
+
+    return flags
+
+
+# iterate over (timestamp, packet) records of packet log file object (timestamp is None if
+# log has no timestamps). records are read one at a time: memory does not grow with log size
+def readLogRecords(f):
+
+    flags = readLogHeader(f)
+    hasTimestamps = bool(flags & LOG_FLAG_TIMESTAMPS)
+    record = LOG_RECORD if hasTimestamps else LOG_SIZE
+
+    while True:
+
+        data = f.read(record.size)
+        if( len(data) < record.size ): return
+
+        if( hasTimestamps ): (timestamp, size) = record.unpack(data)
+        else: (timestamp, size) = (None, record.unpack(data)[0])
+
+        packet = f.read(size)
+        if( len(packet) < size ): return
+
+        yield (timestamp, packet)
+
+
+# check if file path is that of a packet log
+def isLogFile(filePath):
+    return filePath.lower().endswith(LOG_EXTENSIONS)
+
+
+# open packet log file, compressed (gzip or lzma) if file extension is .gz or .xz. compressed
+# files are streamed: neither reads nor writes hold the whole file in memory
+def openLogFile(filePath, mode = 'rb'):
+
+    if( filePath.lower().endswith('.gz') ):
+        return gzip.open(filePath, mode, compresslevel = 6)
+
+    if( filePath.lower().endswith('.xz') ):
+        return lzma.open(filePath, mode)
+
+    return open(filePath, mode, buffering = 1 << 20)
+
+
+# send packets of a packet log to an UDP endpoint, at wall-clock speed, at a multiple of it,
+# or as fast as possible
+class OscReplayer():
+
+    def __init__(self, address, speed = 1.0):
+
+        # destination (ip, port)
+        self.address = address
+
+        # replay speed: 1 is wall-clock speed, 2 twice as fast, etc. 0 for as fast as possible
+        self.speed = speed
+
+        # connected socket: packets are written with a plain send
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.connect(address)
+
+        # stats
+        self.numPackets = 0
+        self.numBytes = 0
+        self.numErrors = 0
+
+    # replay all packets of log file
+    def replayFile(self, filePath):
+
+        with openLogFile(filePath) as f:
+            self.replay( readLogRecords(f) )
+
+    # replay (timestamp, packet) records. records without timestamp are sent at once
+    def replay(self, records):
+
+        # locals
+        send = self.socket.send
+        speed = self.speed
+        startTime = time.perf_counter()
+        firstTimestamp = None
+
+        for (timestamp, packet) in records:
+
+            # wait until packet is due
+            if( speed > 0 and timestamp is not None ):
+                if( firstTimestamp is None ): firstTimestamp = timestamp
+                delay = startTime + (timestamp - firstTimestamp) / speed - time.perf_counter()
+                if( delay > 0 ): time.sleep(delay)
+
+            # send packet
+            try:
+                send(packet)
+                self.numPackets += 1
+                self.numBytes += len(packet)
+            except OSError:
+                self.numErrors += 1
+
+    def close(self):
+        self.socket.close()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Replay an Evertims OSC packet log to an UDP endpoint')
+    parser.add_argument('file', help='packet log file (.osclog, .osclog.gz, .osclog.xz)')
+    parser.add_argument('ip', help='destination ip')
+    parser.add_argument('port', type=int, help='destination port')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed multiplier, 0 for as fast as possible (default: 1)')
+    parser.add_argument('--loop', type=int, default=1, help='number of times the log is replayed (default: 1)')
+    args = parser.parse_args()
+
+    replayer = OscReplayer((args.ip, args.port), args.speed)
+    startTime = time.perf_counter()
+
+    try:
+        for i in range(args.loop): replayer.replayFile(args.file)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        replayer.close()
+
+    duration = time.perf_counter() - startTime
+    print('sent', replayer.numPackets, 'packets (' + str(replayer.numBytes), 'bytes) in', round(duration, 3), 'sec,', replayer.numErrors, 'errors')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
-import bmesh
 import mathutils
 import math
 import gpu
+import numpy as np
 from gpu_extras.batch import batch_for_shader
 
 # ############################################################
@@ -9,61 +9,53 @@ from gpu_extras.batch import batch_for_shader
 # ############################################################
 
 
-# method from the Print3D add-on: create a bmesh from an object
-# (for triangulation, apply modifiers, etc.)
-def bmesh_copy_from_object(obj, transform=True, triangulate=True, apply_modifiers=False):
+# given a Blender object and evaluated depsgraph, return its triangles (modifiers applied) in
+# object local space, as (material index array, Nx9 float32 array of triangle vertices)
+def getLocalFacesArrays(obj, depsgraph):
 
     assert(obj.type == 'MESH')
 
-    if apply_modifiers and obj.modifiers:
-        import bpy
-        me = obj.to_mesh(bpy.context.scene, True, 'PREVIEW', calc_tessface=False)
-        bm = bmesh.new()
-        bm.from_mesh(me)
-        bpy.data.meshes.remove(me)
-        del bpy
-    else:
-        me = obj.data
-        if obj.mode == 'EDIT':
-            bm_orig = bmesh.from_edit_mesh(me)
-            bm = bm_orig.copy()
-        else:
-            bm = bmesh.new()
-            bm.from_mesh(me)
+    # get evaluated mesh
+    objEval = obj.evaluated_get(depsgraph)
+    me = objEval.to_mesh()
 
-    if transform:
-        bm.transform(obj.matrix_world)
+    try:
+        # read vertices, triangles and material indices in bulk
+        me.calc_loop_triangles()
+        co = np.empty(len(me.vertices) * 3, dtype=np.float32)
+        me.vertices.foreach_get('co', co)
+        triVerts = np.empty(len(me.loop_triangles) * 3, dtype=np.int32)
+        me.loop_triangles.foreach_get('vertices', triVerts)
+        matIndices = np.empty(len(me.loop_triangles), dtype=np.int32)
+        me.loop_triangles.foreach_get('material_index', matIndices)
+    finally:
+        objEval.to_mesh_clear()
 
-    if triangulate:
-        bmesh.ops.triangulate(bm, faces=bm.faces)
+    return (matIndices, co.reshape(-1, 3)[triVerts].reshape(-1, 9))
 
-    return bm
 
+# apply a 4x4 transform matrix to Nx9 array of triangle vertices
+def transformFacesArray(facesVerts, matrix):
 
-# given a Blender object, return list of faces vertices and associated materials
-def getFacesMatVertList(obj):
+    mat = np.array(matrix, dtype=np.float32)
+    points = facesVerts.reshape(-1, 3) @ mat[:3, :3].T + mat[:3, 3]
+    return points.reshape(-1, 9)
 
-    # get bmesh
-    bm = bmesh_copy_from_object(obj, transform=True, triangulate=True, apply_modifiers=True)
 
-    # init locals
-    facesMatList = []
-    facesVertList = []
-
-    # loop over mesh faces
-    for face in bm.faces:
+# given a Blender object, return array of material names of its slots, indexed by material index
+# (empty name for empty slots, or as single entry if object has no slot)
+def getMaterialNames(obj):
+    names = [slot.material.name if slot.material is not None else "" for slot in obj.material_slots]
+    return np.array(names if len(names) else [""])
 
-        # get material
-        slot = obj.material_slots[face.material_index]
-        facesMatList.append(slot.material.name)
 
-        # get face vertices
-        vertList = []
-        for v in face.verts: # browse through vertice index
-            vertList = vertList + list(v.co.to_tuple())
-        facesVertList.append(vertList)
+# given a Blender object, return array of faces material names, and Nx9 float32 array of
+# faces vertices in object local space
+def getLocalFacesMatNameVertArrays(obj, depsgraph):
 
-    return (facesMatList, facesVertList)
+    (matIndices, facesVerts) = getLocalFacesArrays(obj, depsgraph)
+    matNames = getMaterialNames(obj)
+    return (matNames[np.minimum(matIndices, len(matNames) - 1)], facesVerts)
 
 
 # check if 2 input matrices are different above a certain threshold.
@@ -99,10 +91,48 @@ def mat4x4ToTuple(mat):
         mat[3][0], mat[3][1], mat[3][2], mat[3][3]  \
         )
 
-# draw a line between two points
-# might be more efficient to create shader once, tests on 4.1 don't suggest so. still, c.f. https://docs.blender.org/api/current/gpu.html#module-gpu
-def draw_line_3d(color, start, end):
-    shader = gpu.shader.from_builtin('UNIFORM_COLOR')
-    batch = batch_for_shader(shader, 'LINES', {"pos": [start,end]})
-    shader.uniform_float("color", color)
-    batch.draw(shader)
+
+# draw a set of lines with a single batch, kept across redraws until its content changes
+class LineBatch():
+
+    def __init__(self, color):
+
+        # init locals
+        self.color = color
+        self.shader = None
+        self.batch = None
+        self.key = None
+
+    # check if batch content is up to date with key (any comparable value identifying content)
+    def isUpToDate(self, key):
+        return self.key is not None and self.key == key
+
+    # (re)build batch from list of segment points: 2 consecutive points per segment
+    def build(self, coords, key):
+
+        # shader creation requires a gpu context: done here rather than in constructor
+        if self.shader is None:
+            self.shader = gpu.shader.from_builtin('UNIFORM_COLOR')
+
+        # discard empty batch
+        if len(coords) == 0: self.batch = None
+        else: self.batch = batch_for_shader(self.shader, 'LINES', {"pos": coords})
+
+        # save key
+        self.key = key
+
+    # draw batch (must be called from a draw handler)
+    def draw(self):
+
+        # discard if nothing to draw
+        if self.batch is None:
+            return
+
+        self.shader.bind()
+        self.shader.uniform_float("color", self.color)
+        self.batch.draw(self.shader)
+
+    # force batch rebuild on next build check
+    def clear(self):
+        self.batch = None
+        self.key = None
@@ -245,13 +245,14 @@ class EvertimsExport(Operator):
 
         # check export file name
         filePath = bpy.path.abspath(evertims.export_file_path)
-        (status, msg) = utils.isValidExportPath(filePath)
+        (status, msg) = utils.isValidExportPath(filePath, evertims.export_animation)
         if status != {'PASS'}:
             self.report(status, msg)
             return {'CANCELLED'}
 
-        # export scene to disk
-        _evertims.exportSceneAsOscList(evertims)
+        # export scene (or scene animation over frame range) to disk
+        if( evertims.export_animation ): _evertims.exportAnimationAsOscLog(evertims)
+        else: _evertims.exportSceneAsOscList(evertims)
 
         return {'FINISHED'}
 
@@ -53,6 +53,13 @@ class VIEW3D_PT_EvertimsToolBar(EvertimsUIBase, Panel):
         colsub.prop(evertims, "ip_local", text="")
         colsub = split.column()
         colsub.prop(evertims, "port_read", text="")
+        #
+        rowsub = box.row(align=True)
+        rowsub.prop(evertims, "osc_bundle_size", text="Max Bundle Size (bytes)")
+        rowsub = box.row(align=True)
+        rowsub.prop(evertims, "osc_bulk_size", text="Room Upload Budget (bytes)")
+        rowsub = box.row(align=True)
+        rowsub.prop(evertims, "send_thread", text="Send In Background Thread")
 
         # Engine configuration
         box = layout.box()
@@ -117,6 +124,14 @@ class VIEW3D_PT_EvertimsToolBar(EvertimsUIBase, Panel):
         colsub = split.column()
         colsub.prop(evertims, "draw_order_max", text="Draw Order Max")
         colsub.enabled = not evertims.enable_auralization
+        rowsub = box.row(align=True)
+        rowsub.enabled = not evertims.enable_auralization and evertims.draw_rays
+        split = rowsub.split(factor=0.5)
+        colsub = split.column()
+        colsub.prop(evertims, "receive_thread", text="Threaded")
+        colsub = split.column()
+        colsub.enabled = not evertims.receive_thread
+        colsub.prop(evertims, "receive_time_budget", text="Budget (ms)")
         #
         rowsub = box.row(align=True)
         rowsub.prop(evertims, "debug_logs", text="Print Logs To Console")
@@ -135,12 +150,16 @@ class VIEW3D_PT_EvertimsToolBar(EvertimsUIBase, Panel):
         box = layout.box()
         box.label(text="Export", icon='EXPORT')
         #
-        # export scene to disk (.txt) as list of osc messages
+        # export scene to disk (.txt) as list of osc messages, or (.osclog[.gz|.xz]) as log of osc
+        # packets, optionally over scene frame range
         rowsub = box.row(align=True)
         rowsub.enabled = not evertims.enable_auralization
         rowsub.prop(evertims, "export_file_path", text="Export File")
         rowsub = box.row(align=True)
         rowsub.enabled = not evertims.enable_auralization
+        rowsub.prop(evertims, "export_animation", text="Export Frame Range (timestamped)")
+        rowsub = box.row(align=True)
+        rowsub.enabled = not evertims.enable_auralization
         rowsub.operator("evertims.export", text="Export Scene To Disk", icon="EXPORT")
         # crystalize acoustic rays in scene as curves
         rowsub = box.row(align=True)
@@ -1,6 +1,7 @@
 import json
 import bpy
 from .evertims import ( EvertMaterial )
+from .evertims.evertReplay import ( LOG_EXTENSIONS, isLogFile )
 
 def dict2str(d):
     return json.dumps(d)
@@ -30,11 +31,14 @@ def str2matDict(s):
 
     return matDict
 
-# check if a file can be created at filePath
-def isValidExportPath(filePath):
+# check if a file can be created at filePath (frame range exports require a packet log)
+def isValidExportPath(filePath, animation = False):
 
-    if( not filePath.lower().endswith('.txt') ):
-        return({'ERROR'}, 'Export file should be a .txt')
+    if( animation and not isLogFile(filePath) ):
+        return({'ERROR'}, 'Frame range export file should be a ' + ', '.join(LOG_EXTENSIONS))
+
+    if( not filePath.lower().endswith('.txt') and not isLogFile(filePath) ):
+        return({'ERROR'}, 'Export file should be a .txt or a ' + ', '.join(LOG_EXTENSIONS))
 
     try:
         open(filePath,'w')